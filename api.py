@@ -1,6 +1,6 @@
 import json
 from fastapi import FastAPI, Query, HTTPException # Import HTTPException
-from fastapi.responses import JSONResponse, FileResponse # Import FileResponse for serving JSON file
+from fastapi.responses import JSONResponse, FileResponse, Response # Import FileResponse for serving JSON file
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import duckdb
@@ -10,6 +10,10 @@ import datetime
 import math # For checking NaN
 import numpy as np # Import numpy for replacing infinite values
 import pandas as pd # Ensure pandas is imported
+try:
+    import orjson # Optional: C JSON parser/serializer for the (large) GeoJSON map payload
+except ImportError:
+    orjson = None
 
 # --- Configuration ---
 BASE_DIR = '.'
@@ -18,6 +22,14 @@ LAKEHOUSE_PATH = os.path.join(BASE_DIR, 'lakehouse_data/lakehouse_disasters')
 FARMER_REGISTRY_PATH = os.path.join(BASE_DIR, 'lakehouse_data/farmer_registry')
 # --- Path to the pre-generated GeoJSON file ---
 AGGREGATED_GEOJSON_FILE = os.path.join(BASE_DIR, 'api_output/api_data.json')
+# Columns the /query filters and aggregation read; the pandas fallback loads only these
+MAP_QUERY_COLUMNS = [
+    'year', 'event_date_start', 'event_date_end', 'province', 'municipality',
+    'commodity', 'disaster_category', 'disaster_name',
+    'losses_php_grand_total', 'farmers_affected', 'area_partially_damaged_ha',
+    'area_totally_damaged_ha', 'area_total_affected_ha', 'losses_php_production_cost',
+    'losses_php_farm_gate'
+]
 # Using in-memory DuckDB for raw queries
 
 app = FastAPI()
@@ -35,32 +47,29 @@ app.add_middleware(
 
 # --- Helper Function to Clean Data for JSON ---
 # (Handles NaN, infinity, dates etc.)
-def clean_data_for_json(data):
-    cleaned_data = []
-    for row_dict in data:
-        cleaned_row = {}
-        for key, value in row_dict.items():
-            if isinstance(value, (np.int64, np.int32)):
-                 # Handle potential Pandas nullable integer <NA> which becomes pd.NA
-                 cleaned_row[key] = int(value) if pd.notna(value) else None
-            elif isinstance(value, (np.float64, np.float32)):
-                if np.isnan(value) or np.isinf(value):
-                    cleaned_row[key] = None # Replace NaN/Inf with None
-                else:
-                    # Round floats that might represent percentages or specific values
-                    if key == 'percentage_farmers_affected':
-                         cleaned_row[key] = round(float(value), 2)
-                    else:
-                         cleaned_row[key] = float(value)
-            elif isinstance(value, (datetime.date, datetime.datetime, pd.Timestamp)):
-                 # Format dates as YYYY-MM-DD strings, handle NaT
-                 cleaned_row[key] = value.strftime('%Y-%m-%d') if pd.notna(value) else None
-            elif pd.isna(value): # Catch remaining pandas NA types (like NaT, None)
-                 cleaned_row[key] = None
-            else:
-                cleaned_row[key] = value
-        cleaned_data.append(cleaned_row)
-    return cleaned_data
+def clean_data_for_json(df):
+    """
+    Converts a query result DataFrame to a list of JSON-safe row dicts.
+    Values are normalized one column at a time (NaN/inf/NaT -> None, dates -> 'YYYY-MM-DD',
+    numpy scalars -> Python numbers) instead of inspecting every cell in Python.
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series):
+            series = series.replace([np.inf, -np.inf], np.nan) # Replace Inf with NaN -> None below
+            # Round floats that might represent percentages or specific values
+            if col == 'percentage_farmers_affected':
+                series = series.round(2)
+            df[col] = series
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            # Format dates as YYYY-MM-DD strings; NaT stays missing
+            df[col] = series.dt.strftime('%Y-%m-%d')
+        elif pd.api.types.infer_dtype(series, skipna=True) in ('date', 'datetime'):
+            df[col] = series.map(lambda v: v.strftime('%Y-%m-%d') if isinstance(v, (datetime.date, datetime.datetime)) else v)
+    # Catch remaining pandas NA types (NaN, NaT, <NA>, None); to_dict turns numpy scalars into Python ones
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict(orient='records')
 
 
 # --- Endpoint to serve the pre-aggregated GeoJSON map data ---
@@ -90,8 +99,12 @@ async def get_aggregated_geojson_map_data(
         raise HTTPException(status_code=404, detail=f"Aggregated map data file not found. Please run 'python data_manager.py export'.")
     
     try:
-        with open(AGGREGATED_GEOJSON_FILE, 'r') as f:
-            geojson_data = json.load(f)
+        if orjson is not None:
+            with open(AGGREGATED_GEOJSON_FILE, 'rb') as f:
+                geojson_data = orjson.loads(f.read())
+        else:
+            with open(AGGREGATED_GEOJSON_FILE, 'r') as f:
+                geojson_data = json.load(f)
     except Exception as e:
         print(f"API ERROR (/query): Could not read base GeoJSON file: {e}")
         raise HTTPException(status_code=500, detail="Could not read base map data.")
@@ -156,7 +169,9 @@ async def get_aggregated_geojson_map_data(
         except Exception:
              print("API WARNING (/query): DuckDB Delta extension failed. Falling back to reading via pandas.")
              dt_main = DeltaTable(safe_lakehouse_path)
-             df_main = dt_main.to_pandas()
+             # Project before converting so unused columns are never decoded from Parquet
+             table_columns = {field.name for field in dt_main.schema().fields}
+             df_main = dt_main.to_pandas(columns=[col for col in MAP_QUERY_COLUMNS if col in table_columns])
              if 'event_date_start' in df_main.columns: df_main['event_date_start'] = pd.to_datetime(df_main['event_date_start'], errors='coerce')
              if 'event_date_end' in df_main.columns: df_main['event_date_end'] = pd.to_datetime(df_main['event_date_end'], errors='coerce')
              if 'year' in df_main.columns: df_main['year'] = pd.to_numeric(df_main['year'], errors='coerce').astype('Int64')
@@ -280,6 +295,10 @@ async def get_aggregated_geojson_map_data(
                 props['commodities_affected'] = [] 
         
         print("API (/query): Successfully merged aggregated data into filtered GeoJSON.")
+        if orjson is not None:
+            # Serialize the whole FeatureCollection in C and skip FastAPI's recursive
+            # jsonable_encoder pass over every coordinate.
+            return Response(content=orjson.dumps(geojson_data, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json")
         return geojson_data
 
     except Exception as e:
@@ -469,8 +488,7 @@ async def get_raw_disaster_data(
         print(f"API (/api/raw): Query returned {len(result_df)} rows.")
 
         # Convert DataFrame to list of dictionaries and clean for JSON
-        data = result_df.to_dict(orient='records')
-        cleaned_data = clean_data_for_json(data)
+        cleaned_data = clean_data_for_json(result_df)
 
         print("API (/api/raw): Returning cleaned data.")
         return {"status": "success", "count": len(cleaned_data), "data": cleaned_data}
@@ -2,12 +2,18 @@ import argparse
 import pandas as pd
 import duckdb
 from deltalake import write_deltalake, DeltaTable # Import DeltaTable
+import pyarrow as pa
+import pyarrow.dataset as ds
 import os
-import glob
-import shutil
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import json # Needed for handling GeoJSON output structure
+import json # Encodes the boundary-source signature stored in app_meta
 from datetime import datetime, date # Import datetime and date for type checking
+try:
+    import pyogrio # Optional: fast GeoJSON -> Arrow reader for the boundaries load
+except ImportError:
+    pyogrio = None
 
 # --- Configuration ---\
 BASE_DIR = '.'
@@ -17,18 +23,95 @@ LAKEHOUSE_PATH = os.path.join(BASE_DIR, 'lakehouse_data/lakehouse_disasters')
 FARMER_LAKEHOUSE_PATH = os.path.join(BASE_DIR, 'lakehouse_data/farmer_registry')
 API_OUTPUT_FILE = os.path.join(BASE_DIR, 'api_output/api_data.json') # Will now store GeoJSON
 DUCKDB_FILE = os.path.join(BASE_DIR, 'lakehouse_data/analysis_db.duckdb') # Using a file is better for persistence if needed
+DUCKDB_MEMORY_LIMIT = '4GB' # Upper bound for DuckDB's buffer manager during export queries
 
 # --- GIS Configuration ---
 GIS_DATA_DIR = os.path.join(BASE_DIR, 'gis_data')
 BOUNDARIES_GEOJSON = os.path.join(GIS_DATA_DIR, 'WV_Municipalities.geojson') # Reverted to Municipalities file
+BOUNDARIES_PARQUET = os.path.join(GIS_DATA_DIR, 'municipal_shapes.parquet') # Written by 'bake-boundaries' or the first export; preferred by export when present
 # --- <<< IMPORTANT: Adjust these property names based on your WV_Municipalities.geojson file >>> ---
 GEOJSON_MUN_PROP = 'adm3_en'        # Property name for Municipality name
 GEOJSON_PROV_PROP = 'adm2_en'       # Property name for Province name
 GEOJSON_PSGC_PROP = 'adm3_psgc'     # Property name for Municipality PSGC code (IDEAL JOIN KEY)
+BOUNDARIES_TABLE_VERSION = 2 # Bump when municipal_boundaries' columns change so cached copies in DUCKDB_FILE are rebuilt
 # --- <<< Adjust these based on your sanitized disaster data columns >>> ---
 DISASTER_MUN_COL = 'municipality' # Column name for Municipality in Delta table
 DISASTER_PROV_COL = 'province'    # Column name for Province in Delta table
 DISASTER_PSGC_COL = 'psgc_code'   # Ensure this is uncommented if sanitizer adds it
+DISASTER_PARTITION_COLS = ['year'] # Delta table is partitioned by year so date-bounded exports can prune files
+DELTA_TARGET_FILE_SIZE = 128 * 1024 * 1024 # Bytes; small files are compacted toward this size after each import
+IMPORT_BATCH_ROWS = 200_000 # CSV rows held in memory at a time while streaming a file into Delta
+# Stored types of the date/numeric disaster columns. CSVs are read as plain text and these are
+# converted with TRY_CAST, so DuckDB does no per-file type sniffing and every file yields the same schema.
+# A 32-bit year is plenty and halves its Parquet footprint; amounts, areas and farmers_affected
+# stay DOUBLE (the source has fractional head counts).
+DISASTER_COLUMN_TYPES = {
+    'year': 'INTEGER',
+    'event_date_start': 'DATE',
+    'event_date_end': 'DATE',
+    'area_partially_damaged_ha': 'DOUBLE',
+    'area_totally_damaged_ha': 'DOUBLE',
+    'area_total_affected_ha': 'DOUBLE',
+    'farmers_affected': 'DOUBLE',
+    'losses_php_production_cost': 'DOUBLE',
+    'losses_php_farm_gate': 'DOUBLE',
+    'losses_php_grand_total': 'DOUBLE',
+}
+
+def _parse_one(con, file_path):
+    """
+    Reads and cleans a single raw disaster CSV; it never touches the Delta table.
+    DuckDB's (multi-threaded) CSV reader parses the file as text and applies the casing and
+    DISASTER_COLUMN_TYPES casts in one vectorized query. The result is returned as an Arrow
+    RecordBatchReader of at most IMPORT_BATCH_ROWS rows per batch, so write_deltalake streams
+    it with bounded memory.
+    Returns (status, reader, message) where status is 'ok', 'empty', 'missing_cols' or 'error'.
+    """
+    try:
+        if os.path.getsize(file_path) == 0:
+            return 'empty', None, None
+        # Relation API rather than a named view: views are shared by every cursor on the database
+        raw_csv = con.read_csv(file_path, all_varchar=True) # Typed below via DISASTER_COLUMN_TYPES
+        columns = raw_csv.columns
+
+        # Build the REPLACE list only for the columns this file actually has
+        replacements = []
+        if DISASTER_MUN_COL in columns:
+             replacements.append(f'UPPER(TRIM("{DISASTER_MUN_COL}")) AS "{DISASTER_MUN_COL}"')
+        if DISASTER_PROV_COL in columns:
+             replacements.append(f'UPPER(TRIM("{DISASTER_PROV_COL}")) AS "{DISASTER_PROV_COL}"')
+        # If using PSGC, store it as a 32-bit integer (9-digit codes fit; blanks become null)
+        # Check if DISASTER_PSGC_COL exists as a variable AND if that column name should exist based on config
+        psgc_col_name = None
+        psgc_col_exists_in_df = False
+        try:
+            psgc_col_name = DISASTER_PSGC_COL
+            if isinstance(psgc_col_name, str) and psgc_col_name in columns:
+                replacements.append(f'TRY_CAST("{psgc_col_name}" AS INTEGER) AS "{psgc_col_name}"')
+                psgc_col_exists_in_df = True
+        except NameError:
+            pass # DISASTER_PSGC_COL is commented out or not defined
+
+        for typed_col, col_type in DISASTER_COLUMN_TYPES.items():
+            if typed_col in columns:
+                replacements.append(f'TRY_CAST("{typed_col}" AS {col_type}) AS "{typed_col}"')
+
+        required_cols = ['year', 'event_date_start', 'province', 'municipality', 'losses_php_grand_total']
+        if psgc_col_exists_in_df: # Add PSGC to required only if it exists
+            required_cols.append(psgc_col_name)
+
+        if not all(col in columns for col in required_cols):
+             missing = [col for col in required_cols if col not in columns]
+             return 'missing_cols', None, f"File {os.path.basename(file_path)} is missing required columns: {missing}."
+
+        cleaned_csv = raw_csv.project(f"* REPLACE ({', '.join(replacements)})") if replacements else raw_csv
+        reader = cleaned_csv.to_arrow_reader(IMPORT_BATCH_ROWS)
+        return 'ok', reader, None
+
+    except Exception as e:
+        import traceback
+        return 'error', None, f"{e}\n{traceback.format_exc()}"
+
 
 def handle_import(mode_override: str = None):
     """
@@ -37,6 +120,11 @@ def handle_import(mode_override: str = None):
     Cleans data and ensures consistent casing for join keys.
     Moves processed files to the PROCESSED_DATA_DIR.
     An 'overwrite' mode can be forced via command-line for initial setup or resets.
+    All files of one import are streamed from DuckDB into a single Delta commit in batches,
+    so memory stays bounded regardless of the CSV sizes and the table only gains one log entry.
+    All files are opened and validated on a thread pool first; the commit's schema is the union of
+    their columns (files lacking a column get nulls), so only a column type conflict skips a file.
+    Files are moved only after that commit succeeds; if it fails, nothing is written or moved.
     """
     print(f"--- Starting Main Data Import ---")
     os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
@@ -52,7 +140,10 @@ def handle_import(mode_override: str = None):
     # --- End Path Construction ---
 
 
-    csv_files = glob.glob(os.path.join(raw_data_abs_path, '*.csv')) # Use absolute path
+    # scandir hands back cached stat info, so filtering and the oldest-first ordering
+    # (deterministic ingest order) need no extra syscalls per file.
+    csv_entries = [e for e in os.scandir(raw_data_abs_path) if e.is_file() and e.name.endswith('.csv')] if os.path.isdir(raw_data_abs_path) else []
+    csv_files = [e.path for e in sorted(csv_entries, key=lambda e: (e.stat().st_mtime, e.name))]
 
     if not csv_files:
         print(f"No new CSV files found in '{raw_data_abs_path}'.")
@@ -60,118 +151,119 @@ def handle_import(mode_override: str = None):
 
     processed_count = 0
     failed_count = 0
-    first_file = True
+    written_files = [] # Files whose rows went into the pending commit
+    empty_files = []
+    skipped_files = []
 
-    # Determine initial write mode
+    # Determine write mode
     write_mode = 'append' # Default
     if mode_override:
         write_mode = mode_override
-        print(f"Forcing initial write mode: '{write_mode}'")
+        print(f"Forcing write mode: '{write_mode}'")
     elif not os.path.exists(lakehouse_abs_path): # Use absolute path
          write_mode = 'overwrite'
-         print("Lakehouse table does not exist. Setting initial write mode to 'overwrite'.")
-
+         print("Lakehouse table does not exist. Setting write mode to 'overwrite'.")
 
-    for i, file_path in enumerate(csv_files):
-        print(f"\nProcessing file: {os.path.basename(file_path)}...")
-        current_write_mode = write_mode
+    # One database for the whole import; each file gets its own cursor so all files can be
+    # sniffed and validated on pool threads. Their schemas are known before the commit starts.
+    con = duckdb.connect()
+    max_workers = min(len(csv_files), os.cpu_count() or 1)
+    cursors = [con.cursor() for _ in csv_files]
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    stream_files = [] # (file_path, reader) of every file handed to the commit
 
-        if write_mode == 'overwrite' and not first_file:
-            current_write_mode = 'append'
-            print("Switching to 'append' mode for subsequent files.")
-
-        try:
-            df = pd.read_csv(file_path)
-
-            if DISASTER_MUN_COL in df.columns:
-                 df[DISASTER_MUN_COL] = df[DISASTER_MUN_COL].astype(str).str.upper().str.strip()
-            if DISASTER_PROV_COL in df.columns:
-                 df[DISASTER_PROV_COL] = df[DISASTER_PROV_COL].astype(str).str.upper().str.strip()
-            # If using PSGC, ensure it's loaded as string
-            # Check if DISASTER_PSGC_COL exists as a variable AND if that column name should exist based on config
-            psgc_col_name = None
-            psgc_col_exists_in_df = False
+    try:
+        futures = [executor.submit(_parse_one, cursor, file_path) for cursor, file_path in zip(cursors, csv_files)]
+        target_schema = None
+        for file_path, future in zip(csv_files, futures):
+            print(f"\nProcessing file: {os.path.basename(file_path)}...")
+            status, reader, message = future.result()
+            if status == 'empty':
+                print(f"Skipping empty file: {os.path.basename(file_path)}")
+                empty_files.append(file_path)
+                continue
+            if status == 'missing_cols':
+                print(f"ERROR: {message} Skipping.")
+                skipped_files.append(file_path)
+                continue
+            if status == 'error':
+                print(f"ERROR processing file {os.path.basename(file_path)}: {message}")
+                skipped_files.append(file_path)
+                continue
+            # The commit's schema is the union of all files' columns (first file's order, new
+            # columns appended); only a column whose type conflicts keeps a file out.
             try:
-                psgc_col_name = DISASTER_PSGC_COL
-                if isinstance(psgc_col_name, str) and psgc_col_name in df.columns:
-                    df[psgc_col_name] = df[psgc_col_name].astype(str).str.strip()
-                    psgc_col_exists_in_df = True
-            except NameError:
-                pass # DISASTER_PSGC_COL is commented out or not defined
-
-
-            if 'event_date_start' in df.columns:
-                df['event_date_start'] = pd.to_datetime(df['event_date_start'], errors='coerce').dt.date
-            if 'event_date_end' in df.columns:
-                df['event_date_end'] = pd.to_datetime(df['event_date_end'], errors='coerce').dt.date
-
-            required_cols = ['year', 'event_date_start', 'province', 'municipality', 'losses_php_grand_total']
-            if psgc_col_exists_in_df: # Add PSGC to required only if it exists
-                required_cols.append(psgc_col_name)
-
-            if not all(col in df.columns for col in required_cols):
-                 missing = [col for col in required_cols if col not in df.columns]
-                 print(f"ERROR: File {os.path.basename(file_path)} is missing required columns: {missing}. Skipping.")
-                 failed_count += 1
-                 continue
-
-            print(f"Writing {len(df)} rows to Delta table in '{current_write_mode}' mode...")
-            # Decide on schema_mode dynamically based on write_mode
-            schema_mode_param = "overwrite" if current_write_mode == 'overwrite' else "merge" #"none" # Use "merge" for append? or handle mismatch
+                target_schema = reader.schema if target_schema is None else pa.unify_schemas([target_schema, reader.schema])
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                print(f"ERROR: Column types of {os.path.basename(file_path)} conflict with the other files: {e} Skipping.")
+                skipped_files.append(file_path)
+                continue
+            stream_files.append((file_path, reader))
+
+        def import_batches():
+            """Every file's batches in turn, laid out as target_schema (absent columns are null)."""
+            for file_path, reader in stream_files:
+                for batch in reader:
+                    yield pa.RecordBatch.from_arrays(
+                        [batch.column(field.name).cast(field.type) if field.name in batch.schema.names
+                         else pa.nulls(batch.num_rows, field.type) for field in target_schema],
+                        schema=target_schema)
+                written_files.append(file_path)
+
+        if stream_files:
             try:
-                 write_deltalake(
-                     lakehouse_abs_path,
-                     df,
-                     mode=current_write_mode,
-                     # schema_mode="overwrite" # Keep schema fixed after initial overwrite
-                 )
-            except Exception as write_err:
-                 # Catch potential schema mismatch on append
-                 if "Schema mismatch detected" in str(write_err) or "number of fields does not match" in str(write_err):
-                      print("\nSCHEMA MISMATCH DETECTED:")
-                      print(f"Error: {write_err}")
-                      print("The schema of the CSV file being imported does not match the existing Delta table.")
-                      print("This usually happens if columns were added/removed/renamed in sanitizer.py after the table was first created.")
-                      print("\nOPTIONS:")
-                      print("1. Re-run the import with '--mode overwrite' to replace the table (DELETES EXISTING DATA):")
-                      print("   python data_manager.py import --mode overwrite")
-                      print("2. (Advanced) Manually ALTER the Delta table schema or add 'schema_mode=\"merge\"'/'schema_mode=\"overwrite\"' to write_deltalake call (see Delta Lake docs).")
-                      print("Skipping this file due to schema mismatch.")
-                      failed_count += 1
-                      continue # Skip to next file
-                 else:
-                      raise # Re-raise other unexpected write errors
-
-
-            print("Write successful.")
+                print(f"Streaming rows to Delta table in '{write_mode}' mode ({IMPORT_BATCH_ROWS} rows per batch)...")
+                # Partitioning is only declared when (re)creating the table; appends inherit it.
+                # schema_mode="overwrite" lets an overwrite convert an older unpartitioned table;
+                # "merge" lets an append add the columns any of these files introduce (rows from
+                # the table and from files without them read as null).
+                write_deltalake(
+                    lakehouse_abs_path,
+                    pa.RecordBatchReader.from_batches(target_schema, import_batches()),
+                    mode=write_mode,
+                    partition_by=DISASTER_PARTITION_COLS if write_mode == 'overwrite' else None,
+                    schema_mode="overwrite" if write_mode == 'overwrite' else "merge",
+                )
+                print(f"Write successful ({len(written_files)} file(s) in one commit).")
+
+            except Exception as e:
+                print(f"ERROR writing to Delta table: {e}")
+                import traceback
+                traceback.print_exc()
+                print("Nothing was imported; all files are left in place.")
+                print("If column types changed in sanitizer.py, re-run with '--mode overwrite' to replace the table (DELETES EXISTING DATA).")
+                # The commit is all-or-nothing: every file handed to the stream failed, read or not
+                failed_count += len(stream_files)
+                written_files.clear()
+    finally:
+        executor.shutdown(wait=True)
+        for cursor in cursors:
+            cursor.close()
+        con.close()
 
-            try:
-                processed_file_path = os.path.join(processed_data_abs_path, os.path.basename(file_path)) # Use absolute path
-                if os.path.exists(processed_file_path): os.remove(processed_file_path)
-                shutil.move(file_path, processed_file_path)
-                print(f"Moved processed file to: {processed_file_path}")
-                processed_count += 1
-            except Exception as move_err:
-                 print(f"ERROR moving file {os.path.basename(file_path)} after successful processing: {move_err}")
-                 failed_count += 1
+    failed_count += len(skipped_files)
 
-        except pd.errors.EmptyDataError:
-            print(f"Skipping empty file: {os.path.basename(file_path)}")
-            try:
-                processed_file_path = os.path.join(processed_data_abs_path, os.path.basename(file_path)) # Use absolute path
-                if os.path.exists(processed_file_path): os.remove(processed_file_path)
-                shutil.move(file_path, processed_file_path)
-                print(f"Moved empty file to: {processed_file_path}")
-            except Exception as move_err:
-                print(f"ERROR moving empty file {os.path.basename(file_path)}: {move_err}")
-                failed_count += 1
-        except Exception as e:
-            print(f"ERROR processing file {os.path.basename(file_path)}: {e}")
-            import traceback
-            traceback.print_exc()
-            failed_count += 1
+    # --- Move files only once their rows are committed ---
+    for file_path in written_files + empty_files:
+        try:
+            processed_file_path = os.path.join(processed_data_abs_path, os.path.basename(file_path)) # Use absolute path
+            os.replace(file_path, processed_file_path) # Atomic; overwrites a same-named earlier file
+            print(f"Moved {'empty' if file_path in empty_files else 'processed'} file to: {processed_file_path}")
+            if file_path not in empty_files:
+                processed_count += 1
+        except Exception as move_err:
+             print(f"ERROR moving file {os.path.basename(file_path)}: {move_err}")
+             failed_count += 1
 
-        first_file = False
+    # --- Compact small files accumulated by earlier imports ---
+    if processed_count > 0:
+        try:
+            print("\nCompacting Delta table files...")
+            metrics = DeltaTable(lakehouse_abs_path).optimize.compact(target_size=DELTA_TARGET_FILE_SIZE)
+            print(f"Compaction done: {metrics.get('numFilesRemoved', 0)} file(s) merged into {metrics.get('numFilesAdded', 0)}.")
+        except Exception as optimize_err:
+            # The imported data is already committed; a failed compaction only leaves more files behind
+            print(f"WARNING: Delta table compaction failed: {optimize_err}")
 
     print(f"\nSuccessfully imported and moved {processed_count} CSV file(s).")
     if failed_count > 0:
@@ -179,69 +271,225 @@ def handle_import(mode_override: str = None):
     print("--- Import Complete ---")
 
 
-def df_to_geojson(df, geometry_col='geometry_geojson'):
-    """Converts a DataFrame with a GeoJSON geometry string column to a GeoJSON FeatureCollection dictionary."""
-    features = []
-    # Adjust required columns based on whether PSGC is expected
-    base_required = ['municipality_name', 'province_name', geometry_col]
-    psgc_code_alias = 'psgc_code' # Alias used in the SQL query
+def connect_duckdb(database=':memory:'):
+    """
+    Opens a DuckDB connection configured for the analysis queries and loads the spatial and delta
+    extensions. Uses every CPU core, caps memory at DUCKDB_MEMORY_LIMIT, keeps Parquet metadata
+    cached between queries, and only runs INSTALL for an extension that is not installed yet.
+    Delta is optional: if it cannot be loaded, handle_export scans the table with PyArrow instead.
+    """
+    con = duckdb.connect(database=database, read_only=False)
+    con.execute(f"PRAGMA threads={os.cpu_count() or 1}")
+    con.execute(f"PRAGMA memory_limit='{DUCKDB_MEMORY_LIMIT}'")
+    con.execute("SET parquet_metadata_cache = true") # Successor of the legacy enable_object_cache setting
+    installed = {name for (name,) in con.execute("SELECT extension_name FROM duckdb_extensions() WHERE installed").fetchall()}
+    if 'spatial' not in installed:
+        con.sql("INSTALL spatial;")
+    con.sql("LOAD spatial;")
     try:
-        # Check if DISASTER_PSGC_COL constant suggests we should expect psgc_code
-        if isinstance(DISASTER_PSGC_COL, str):
-            base_required.append(psgc_code_alias)
-    except NameError:
-        pass # PSGC not configured
-
-    # Check if essential geometry/ID columns exist in the DataFrame
-    if not all(col in df.columns for col in base_required):
-        missing = [col for col in base_required if col not in df.columns]
-        print(f"ERROR in df_to_geojson: DataFrame is missing required columns for GeoJSON creation: {missing}")
-        return {"type": "FeatureCollection", "features": []} # Return empty valid GeoJSON
-
-    for _, row in df.iterrows():
-        # Ensure geometry is valid before proceeding
-        geom_str = row.get(geometry_col)
-        if pd.isna(geom_str):
-            print(f"Skipping row for {row.get('municipality_name', 'Unknown')} due to missing geometry.")
-            continue
+        if 'delta' not in installed:
+            con.sql("INSTALL delta;")
+        con.sql("LOAD delta;")
+    except duckdb.Error as delta_ext_err:
+        print(f"DuckDB delta extension unavailable ({delta_ext_err}).")
+    return con
+
+
+def _boundaries_signature(boundaries_abs_path, baked_boundaries_abs_path):
+    """
+    Identifies the current boundary sources: the table layout version, the GEOJSON_*_PROP
+    settings and the modification times of the GeoJSON and baked Parquet files (None if missing).
+    """
+    mtimes = [os.path.getmtime(path) if os.path.exists(path) else None
+              for path in (boundaries_abs_path, baked_boundaries_abs_path)]
+    return json.dumps([BOUNDARIES_TABLE_VERSION, GEOJSON_MUN_PROP, GEOJSON_PROV_PROP, GEOJSON_PSGC_PROP] + mtimes)
+
+
+_duckdb_connections = {} # database path -> connection kept open for the life of the process
+
+
+def get_duckdb_connection(database):
+    """
+    Returns a long-lived connection to 'database', opening it (and loading spatial) on first use.
+    Later calls in the same process, e.g. a scheduler or API running handle_export repeatedly,
+    skip the database open, WAL replay and extension load.
+    """
+    con = _duckdb_connections.get(database)
+    if con is None:
+        con = connect_duckdb(database)
+        _duckdb_connections[database] = con
+    return con
+
+
+def close_duckdb_connections():
+    """Closes every connection opened by get_duckdb_connection. Runs automatically at exit."""
+    while _duckdb_connections:
+        database, con = _duckdb_connections.popitem()
         try:
-             geometry_obj = json.loads(geom_str)
-        except (json.JSONDecodeError, TypeError) as e:
-            print(f"Skipping row for {row.get('municipality_name', 'Unknown')} due to invalid geometry string: {geom_str}, Error: {e}")
-            continue
-
-        # Prepare properties, excluding geometry
-        properties = row.drop(geometry_col, errors='ignore').to_dict()
-        cleaned_properties = {}
-        for k, v in properties.items():
-            if pd.isna(v):
-                cleaned_properties[k] = None
-            elif isinstance(v, (np.int64, np.int32)):
-                 cleaned_properties[k] = int(v)
-            elif isinstance(v, (np.float64, np.float32)):
-                 if np.isnan(v) or np.isinf(v): cleaned_properties[k] = None
-                 else: cleaned_properties[k] = float(v)
-            elif isinstance(v, (datetime, pd.Timestamp, date)): # <-- FIXED THIS LINE
-                 cleaned_properties[k] = v.isoformat()
-            else:
-                 cleaned_properties[k] = v
+            con.close()
+            print(f"Closed DuckDB connection to '{database}'.")
+        except Exception as e:
+            print(f"WARNING: Could not close DuckDB connection to '{database}': {e}")
 
-        features.append({
-            "type": "Feature",
-            "geometry": geometry_obj,
-            "properties": cleaned_properties
-        })
 
-    return {"type": "FeatureCollection", "features": features}
+atexit.register(close_duckdb_connections)
 
 
-def handle_export():
+def load_boundaries_geojson(con, boundaries_abs_path):
+    """
+    Parses the municipal boundaries GeoJSON into the municipal_boundaries table
+    (geom, municipality_name, province_name, psgc_code, plus the upper-cased name join keys
+    mun_u/prov_u and the pre-serialized geometry geom_geojson) on the given DuckDB connection.
+    Expects the spatial extension to be loaded. Returns True on success; errors are printed.
+    """
+    # --- [FIXED BLOCK] ---
+    # This block is updated to remove 'properties->>' and handle 'geom' vs 'geometry'
+    try:
+        # Load Municipality data. ST_Read flattens GeoJSON properties into top-level columns.
+        # We also need to find the geometry column. The original error suggested 'geom'
+        # might be the name, or it could be 'geometry'.
+        print(f"Attempting to load boundaries from '{boundaries_abs_path}'...")
+        print(f"Using properties: MUN='{GEOJSON_MUN_PROP}', PROV='{GEOJSON_PROV_PROP}', PSGC='{GEOJSON_PSGC_PROP}'")
+
+        if pyogrio is not None:
+            # pyogrio decodes the GeoJSON straight into an Arrow table (geometry as WKB),
+            # which DuckDB scans in place; much faster than ST_Read's GDAL feature loop.
+            boundary_props = [GEOJSON_MUN_PROP, GEOJSON_PROV_PROP, GEOJSON_PSGC_PROP]
+            boundaries_meta, boundaries_arrow = pyogrio.read_arrow(boundaries_abs_path, columns=boundary_props)
+            missing_props = [prop for prop in boundary_props if prop not in boundaries_meta['fields']]
+            if missing_props:
+                print(f"ERROR: Configured GeoJSON property column(s) not found: {missing_props}")
+                print("Please check your GEOJSON_*_PROP settings in the script against the GeoJSON file.")
+                return False
+            # Re-add the geometry under a plain name so its geoarrow field metadata is dropped
+            # and DuckDB sees an ordinary WKB blob.
+            geom_idx = boundaries_arrow.schema.get_field_index(boundaries_meta['geometry_name'] or 'wkb_geometry')
+            boundaries_arrow = boundaries_arrow.set_column(geom_idx, 'geom_wkb', boundaries_arrow.column(geom_idx))
+            con.register('boundaries_arrow', boundaries_arrow)
+            con.sql(f"""
+                CREATE OR REPLACE TABLE municipal_boundaries AS
+                SELECT
+                    ST_GeomFromWKB(geom_wkb) AS geom,
+                    "{GEOJSON_MUN_PROP}" AS municipality_name,
+                    "{GEOJSON_PROV_PROP}" AS province_name,
+                    "{GEOJSON_PSGC_PROP}" AS psgc_code, -- Municipality PSGC
+                    UPPER("{GEOJSON_MUN_PROP}") AS mun_u, -- Upper-cased join keys, computed once at load
+                    UPPER("{GEOJSON_PROV_PROP}") AS prov_u,
+                    ST_AsGeoJSON(ST_GeomFromWKB(geom_wkb)) AS geom_geojson -- Serialized once here, not per export
+                FROM boundaries_arrow;
+            """)
+            con.unregister('boundaries_arrow')
+            print("Successfully loaded boundaries via pyogrio (Arrow).")
+        else:
+            print("pyogrio not installed; falling back to DuckDB ST_Read (pip install pyogrio for faster loads).")
+            # Look up the layer's column names first; binding ST_Read with LIMIT 0 only reads
+            # the schema, so the GeoJSON is parsed once, by the CREATE below.
+            st_read_cols = {row[0] for row in con.sql(f"DESCRIBE SELECT * FROM ST_Read('{boundaries_abs_path}') LIMIT 0").fetchall()}
+            missing_props = [prop for prop in (GEOJSON_MUN_PROP, GEOJSON_PROV_PROP, GEOJSON_PSGC_PROP) if prop not in st_read_cols]
+            if missing_props:
+                print(f"ERROR: Configured GeoJSON property column(s) not found: {missing_props}")
+                print("Please check your GEOJSON_*_PROP settings in the script against the GeoJSON file.")
+                return False
+            # ST_Read names the geometry column 'geom' in most versions, 'geometry' in some
+            geom_col = 'geom' if 'geom' in st_read_cols else 'geometry'
+            con.sql(f"""
+                CREATE OR REPLACE TABLE municipal_boundaries AS
+                SELECT
+                    "{geom_col}" AS geom,
+                    "{GEOJSON_MUN_PROP}" AS municipality_name,
+                    "{GEOJSON_PROV_PROP}" AS province_name,
+                    "{GEOJSON_PSGC_PROP}" AS psgc_code, -- Municipality PSGC
+                    UPPER("{GEOJSON_MUN_PROP}") AS mun_u, -- Upper-cased join keys, computed once at load
+                    UPPER("{GEOJSON_PROV_PROP}") AS prov_u,
+                    ST_AsGeoJSON("{geom_col}") AS geom_geojson -- Serialized once here, not per export
+                FROM ST_Read('{boundaries_abs_path}');
+            """)
+            print(f"Successfully loaded boundaries using '{geom_col}' as the geometry column.")
+
+    except duckdb.BinderException as be:
+         # This outer catch block will catch errors from the inner logic
+         print("\n--- DETAILED BINDER ERROR ---")
+         print(f"Failed to load GeoJSON: {be}")
+         print("\nThis error usually means one of two things:")
+         print(f"1. The geometry column in your GeoJSON is not named 'geom' or 'geometry'.")
+         print(f"2. A property column name in your script configuration is wrong:")
+         print(f"   - Municipality Property: '{GEOJSON_MUN_PROP}'")
+         print(f"   - Province Property:     '{GEOJSON_PROV_PROP}'")
+         print(f"   - PSGC Property:         '{GEOJSON_PSGC_PROP}'")
+         print("\nTo fix, please:")
+         print(f"1. Open the file: {boundaries_abs_path}")
+         print(f"2. Check the *exact* spelling and case of the property names (e.g., 'adm3_en', 'adm2_en').")
+         print(f"3. Update the GEOJSON..._PROP constants at the top of the script to match.")
+         print("---------------------------------\n")
+         import traceback; traceback.print_exc(); return False
+    except Exception as e:
+        print(f"ERROR loading GeoJSON: {e}")
+        import traceback; traceback.print_exc(); return False
+    # --- [END FIXED BLOCK] ---
+    return True
+
+
+def write_baked_boundaries(con, baked_boundaries_abs_path):
+    """
+    Writes the loaded municipal_boundaries table to a ZSTD-compressed Parquet file.
+    Geometry is stored as plain WKB so the file reads back the same on any spatial version.
+    """
+    con.sql(f"""
+        COPY (
+            SELECT ST_AsWKB(geom)::BLOB AS geom_wkb, municipality_name, province_name, psgc_code
+            FROM municipal_boundaries
+        ) TO '{baked_boundaries_abs_path}' (FORMAT PARQUET, COMPRESSION ZSTD);
+    """)
+
+
+def handle_bake_boundaries():
+    """
+    Parses the municipal boundaries GeoJSON once and writes the shapes to a
+    ZSTD-compressed Parquet file (BOUNDARIES_PARQUET). handle_export reads that
+    file instead of re-parsing the GeoJSON on every run, and bakes it itself when
+    the file is missing or older than the GeoJSON.
+    Re-run this whenever the GEOJSON_*_PROP settings change.
+    """
+    print("--- Baking Municipal Boundaries ---")
+    con = None
+
+    try:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+    except NameError:
+        script_dir = os.getcwd()
+    boundaries_abs_path = os.path.join(script_dir, BOUNDARIES_GEOJSON)
+    baked_boundaries_abs_path = os.path.join(script_dir, BOUNDARIES_PARQUET)
+
+    if not os.path.exists(boundaries_abs_path):
+        print(f"ERROR: Boundaries GeoJSON file not found at {boundaries_abs_path}")
+        return
+
+    try:
+        con = connect_duckdb() # In-memory; only the Parquet file is kept
+        if not load_boundaries_geojson(con, boundaries_abs_path):
+            return
+        write_baked_boundaries(con, baked_boundaries_abs_path)
+        print(f"Baked {con.sql('SELECT COUNT(*) FROM municipal_boundaries').fetchone()[0]} municipal shapes to '{baked_boundaries_abs_path}'.")
+    except Exception as e:
+        print(f"ERROR baking boundaries: {e}")
+        import traceback; traceback.print_exc()
+    finally:
+        if con:
+            con.close()
+
+    print("--- Bake Complete ---")
+
+
+def handle_export(since: date = None):
     """
     Analyzes the main Delta Lake table using DuckDB, joins with Municipality GIS data,
     and exports aggregated results as GeoJSON.
+    If 'since' is given, only events starting on or after that date are aggregated;
+    the matching 'year' filter lets the partitioned Delta table skip older files.
     """
     print("--- Starting Data Export for API ---")
-    con = None
+    if since:
+        print(f"Restricting export to events starting on or after {since.isoformat()}.")
 
     # --- Construct absolute paths ---
     try:
@@ -251,98 +499,71 @@ def handle_export():
 
     duckdb_abs_path = os.path.join(script_dir, DUCKDB_FILE)
     boundaries_abs_path = os.path.join(script_dir, BOUNDARIES_GEOJSON)
+    baked_boundaries_abs_path = os.path.join(script_dir, BOUNDARIES_PARQUET)
     lakehouse_abs_path = os.path.join(script_dir, LAKEHOUSE_PATH)
     api_output_abs_path = os.path.join(script_dir, API_OUTPUT_FILE)
     api_output_dir = os.path.dirname(api_output_abs_path)
     # --- End Path Construction ---
 
     try:
-        con = duckdb.connect(database=duckdb_abs_path, read_only=False)
-        print("Connected to DuckDB.")
-        con.sql("INSTALL spatial; LOAD spatial;")
-        print("Loaded DuckDB spatial extension.")
+        con = get_duckdb_connection(duckdb_abs_path) # Kept open across exports in this process
+        print("Connected to DuckDB and loaded spatial extension.")
 
         # --- Load Municipal Boundaries ---
-        if not os.path.exists(boundaries_abs_path):
-             print(f"ERROR: Boundaries GeoJSON file not found at {boundaries_abs_path}")
-             return
-        
-        # --- [FIXED BLOCK] ---
-        # This block is updated to remove 'properties->>' and handle 'geom' vs 'geometry'
-        try:
-            # Load Municipality data. ST_Read flattens GeoJSON properties into top-level columns.
-            # We also need to find the geometry column. The original error suggested 'geom'
-            # might be the name, or it could be 'geometry'.
-            print(f"Attempting to load boundaries from '{boundaries_abs_path}'...")
-            print(f"Using properties: MUN='{GEOJSON_MUN_PROP}', PROV='{GEOJSON_PROV_PROP}', PSGC='{GEOJSON_PSGC_PROP}'")
-
-            # First, let's try to find the geometry column name ('geom' or 'geometry')
-            # and create the table in one go.
-            try:
-                # Attempt 1: Assume geometry column is 'geom' and select properties directly
+        # The table and its indexes persist in the DuckDB file; they are only rebuilt when the
+        # boundary sources (or the property settings) changed since the last export.
+        con.sql("CREATE TABLE IF NOT EXISTS app_meta (key VARCHAR PRIMARY KEY, value VARCHAR);")
+        cached_signature = con.execute("SELECT value FROM app_meta WHERE key = 'boundaries_source'").fetchone()
+        has_boundaries_table = con.execute("SELECT 1 FROM information_schema.tables WHERE table_name = 'municipal_boundaries'").fetchone()
+        if has_boundaries_table and cached_signature and cached_signature[0] == _boundaries_signature(boundaries_abs_path, baked_boundaries_abs_path):
+            print("Municipal boundaries in the DuckDB file are up to date; skipping reload.")
+        else:
+            baked_is_stale = os.path.exists(baked_boundaries_abs_path) and os.path.exists(boundaries_abs_path) \
+                and os.path.getmtime(boundaries_abs_path) > os.path.getmtime(baked_boundaries_abs_path)
+            if os.path.exists(baked_boundaries_abs_path) and not baked_is_stale:
+                # Baked shapes: a columnar scan instead of parsing the GeoJSON again
                 con.sql(f"""
                     CREATE OR REPLACE TABLE municipal_boundaries AS
-                    SELECT
-                        geom, -- Assume geometry column is 'geom'
-                        "{GEOJSON_MUN_PROP}" AS municipality_name,
-                        "{GEOJSON_PROV_PROP}" AS province_name,
-                        "{GEOJSON_PSGC_PROP}" AS psgc_code -- Municipality PSGC
-                    FROM ST_Read('{boundaries_abs_path}');
+                    SELECT ST_GeomFromWKB(geom_wkb) AS geom, municipality_name, province_name, psgc_code,
+                           UPPER(municipality_name) AS mun_u, UPPER(province_name) AS prov_u,
+                           ST_AsGeoJSON(ST_GeomFromWKB(geom_wkb)) AS geom_geojson
+                    FROM read_parquet('{baked_boundaries_abs_path}');
                 """)
-                print("Successfully loaded boundaries assuming 'geom' column.")
-            except duckdb.BinderException as be_geom:
-                # This error means a configured property name (e.g., 'adm3_en') was not found
-                if f'column "{GEOJSON_MUN_PROP}" does not exist' in str(be_geom) or \
-                   f'column "{GEOJSON_PROV_PROP}" does not exist' in str(be_geom) or \
-                   f'column "{GEOJSON_PSGC_PROP}" does not exist' in str(be_geom):
-                    print(f"ERROR: A configured GeoJSON property column was not found: {be_geom}")
-                    print("Please check your GEOJSON_*_PROP settings in the script against the GeoJSON file.")
-                    raise # Re-raise this critical error
-                
-                # This error means 'geom' wasn't the geometry column, so we try 'geometry'
-                elif 'column "geom" does not exist' in str(be_geom):
-                    print("Column 'geom' not found. Retrying with 'geometry' as the geometry column...")
-                    con.sql(f"""
-                        CREATE OR REPLACE TABLE municipal_boundaries AS
-                        SELECT
-                            geometry AS geom, -- Assume geometry column is 'geometry' and alias it
-                            "{GEOJSON_MUN_PROP}" AS municipality_name,
-                            "{GEOJSON_PROV_PROP}" AS province_name,
-                            "{GEOJSON_PSGC_PROP}" AS psgc_code -- Municipality PSGC
-                        FROM ST_Read('{boundaries_abs_path}');
-                    """)
-                    print("Successfully loaded boundaries assuming 'geometry' column and aliasing to 'geom'.")
-                else:
-                    # Another binder error
-                    print(f"An unexpected BinderException occurred: {be_geom}")
-                    raise be_geom # Re-raise the error
-
-            # Index on municipality identifiers
-            con.sql("CREATE INDEX IF NOT EXISTS mun_bound_psgc_idx ON municipal_boundaries (psgc_code);")
-            con.sql("CREATE INDEX IF NOT EXISTS mun_bound_name_idx ON municipal_boundaries (UPPER(province_name), UPPER(municipality_name));")
-            print(f"Loaded and indexed boundaries from '{os.path.basename(BOUNDARIES_GEOJSON)}'.")
-
-        except duckdb.BinderException as be:
-             # This outer catch block will catch errors from the inner logic
-             print("\n--- DETAILED BINDER ERROR ---")
-             print(f"Failed to load GeoJSON: {be}")
-             print("\nThis error usually means one of two things:")
-             print(f"1. The geometry column in your GeoJSON is not named 'geom' or 'geometry'.")
-             print(f"2. A property column name in your script configuration is wrong:")
-             print(f"   - Municipality Property: '{GEOJSON_MUN_PROP}'")
-             print(f"   - Province Property:     '{GEOJSON_PROV_PROP}'")
-             print(f"   - PSGC Property:         '{GEOJSON_PSGC_PROP}'")
-             print("\nTo fix, please:")
-             print(f"1. Open the file: {boundaries_abs_path}")
-             print(f"2. Check the *exact* spelling and case of the property names (e.g., 'adm3_en', 'adm2_en').")
-             print(f"3. Update the GEOJSON..._PROP constants at the top of the script to match.")
-             print("---------------------------------\n")
-             import traceback; traceback.print_exc(); return
-        except Exception as e:
-            print(f"ERROR loading or indexing GeoJSON: {e}")
-            import traceback; traceback.print_exc(); return
-        # --- [END FIXED BLOCK] ---
+                print(f"Loaded baked boundaries from '{os.path.basename(BOUNDARIES_PARQUET)}'.")
+            else:
+                if not os.path.exists(boundaries_abs_path):
+                     print(f"ERROR: Boundaries GeoJSON file not found at {boundaries_abs_path}")
+                     return
+                if baked_is_stale:
+                     print("Boundaries GeoJSON is newer than the baked Parquet file; re-baking it.")
+                if not load_boundaries_geojson(con, boundaries_abs_path):
+                     return
+                # Bake on first use so later exports take the Parquet path above
+                try:
+                     write_baked_boundaries(con, baked_boundaries_abs_path)
+                     print(f"Baked municipal shapes to '{os.path.basename(BOUNDARIES_PARQUET)}' for later exports.")
+                except Exception as e:
+                     # The boundaries are already loaded for this run; only the cache is missing
+                     print(f"WARNING: Could not write baked boundaries to {baked_boundaries_abs_path}: {e}")
 
+            try:
+                # Index on municipality identifiers
+                con.sql("CREATE INDEX IF NOT EXISTS mun_bound_psgc_idx ON municipal_boundaries (psgc_code);")
+                con.sql("CREATE INDEX IF NOT EXISTS mun_bound_name_idx ON municipal_boundaries (prov_u, mun_u);")
+                print("Indexed municipal boundaries.")
+            except Exception as e:
+                print(f"ERROR indexing municipal boundaries: {e}")
+                import traceback; traceback.print_exc(); return
+            try:
+                # R-Tree on the shapes so spatial predicates (ST_Intersects etc.) can use index lookups
+                con.sql("CREATE INDEX IF NOT EXISTS mun_bound_geom_rtree ON municipal_boundaries USING RTREE (geom);")
+            except Exception as e:
+                # Needs a spatial extension with R-Tree support; the attribute joins above do not depend on it
+                print(f"WARNING: Could not create R-Tree index on municipal boundaries: {e}")
+
+            # Recorded after baking, since baking updates the Parquet file's mtime
+            con.execute("INSERT OR REPLACE INTO app_meta VALUES ('boundaries_source', ?)",
+                        [_boundaries_signature(boundaries_abs_path, baked_boundaries_abs_path)])
 
         # --- Read Main Disaster Data from Delta Lake ---
         print("Reading main disaster data from Delta Lake...")
@@ -350,25 +571,36 @@ def handle_export():
              if not os.path.exists(lakehouse_abs_path):
                   print(f"ERROR: Disaster Delta table path not found at {lakehouse_abs_path}")
                   return
-             dt = DeltaTable(lakehouse_abs_path)
-             main_disasters_df = dt.to_pandas()
-             # Ensure correct types after loading from Delta/Pandas
+             dt = DeltaTable(lakehouse_abs_path) # Only the transaction log is read here
+             # Only project the columns the aggregation query touches; Parquet skips the rest entirely
+             export_cols = [DISASTER_MUN_COL, DISASTER_PROV_COL, DISASTER_PSGC_COL, 'year', 'event_date_start', 'losses_php_grand_total']
+             table_cols = {field.name for field in dt.schema().fields}
+             read_cols = [col for col in export_cols if isinstance(col, str) and col in table_cols]
+             select_sql = ", ".join(f'"{col}"' for col in read_cols)
              psgc_col_exists_in_df = False
              try:
                  # Check if DISASTER_PSGC_COL is defined and is a string
-                 if isinstance(DISASTER_PSGC_COL, str) and DISASTER_PSGC_COL in main_disasters_df.columns:
-                      main_disasters_df[DISASTER_PSGC_COL] = main_disasters_df[DISASTER_PSGC_COL].astype(str)
-                      psgc_col_exists_in_df = True
+                 psgc_col_exists_in_df = isinstance(DISASTER_PSGC_COL, str) and DISASTER_PSGC_COL in read_cols
              except NameError:
                  pass # DISASTER_PSGC_COL likely commented out
 
-             if DISASTER_MUN_COL in main_disasters_df.columns:
-                   main_disasters_df[DISASTER_MUN_COL] = main_disasters_df[DISASTER_MUN_COL].astype(str).str.upper()
-             if DISASTER_PROV_COL in main_disasters_df.columns:
-                   main_disasters_df[DISASTER_PROV_COL] = main_disasters_df[DISASTER_PROV_COL].astype(str).str.upper()
-
-             con.register('main_disasters_df', main_disasters_df)
-             print(f"Read {len(main_disasters_df)} rows from disaster Delta table.")
+             # DuckDB scans the table itself (no pandas copy); the year filter in the query is
+             # pushed down into the scan, so older partitions are never opened. connect_duckdb already
+             # tried to load delta; if it is not loaded, go straight to the fallback rather than let
+             # delta_scan attempt another install on every export.
+             delta_status = con.execute("SELECT loaded FROM duckdb_extensions() WHERE extension_name = 'delta'").fetchone()
+             try:
+                 if not (delta_status and delta_status[0]):
+                     raise RuntimeError("delta extension not loaded")
+                 con.execute(f"CREATE OR REPLACE TEMP VIEW main_disasters_df AS SELECT {select_sql} FROM delta_scan('{lakehouse_abs_path}')")
+                 print("Scanning disaster Delta table with DuckDB delta_scan.")
+             except Exception as delta_ext_err:
+                 print(f"DuckDB delta_scan unavailable ({delta_ext_err}). Scanning the table as a PyArrow dataset instead.")
+                 # Name join keys stay dictionary-encoded as stored in Parquet (few distinct values),
+                 # so they are not expanded into one string per row before DuckDB hashes them.
+                 dictionary_cols = {col for col in (DISASTER_MUN_COL, DISASTER_PROV_COL) if col in read_cols}
+                 con.register('disasters_dataset', dt.to_pyarrow_dataset(parquet_read_options=ds.ParquetReadOptions(dictionary_columns=dictionary_cols)))
+                 con.execute(f"CREATE OR REPLACE TEMP VIEW main_disasters_df AS SELECT {select_sql} FROM disasters_dataset")
         except Exception as e:
              print(f"ERROR reading disaster Delta table at {lakehouse_abs_path}: {e}")
              import traceback; traceback.print_exc(); return
@@ -378,45 +610,70 @@ def handle_export():
              join_condition = f"md.{DISASTER_PSGC_COL} = mb.psgc_code" # Join using Mun PSGC
              print(f"Using PSGC ('{DISASTER_PSGC_COL}' and 'psgc_code') for joining.")
         else:
-             join_condition = f"UPPER(md.{DISASTER_MUN_COL}) = UPPER(mb.municipality_name) AND UPPER(md.{DISASTER_PROV_COL}) = UPPER(mb.province_name)"
+             # Both sides are already upper-cased (at import and at boundary load), so this is a plain equi-join
+             join_condition = f"md.{DISASTER_MUN_COL} = mb.mun_u AND md.{DISASTER_PROV_COL} = mb.prov_u"
              print("Warning: PSGC code column not found or configured in disaster data. Falling back to joining on Province and Municipality names. Ensure consistency.")
 
+        # --- Optional date window (applies to 'md' table) ---
+        where_sql = ""
+        query_params = []
+        if since:
+            where_sql = "WHERE md.year >= ? AND CAST(md.event_date_start AS DATE) >= ?"
+            query_params = [since.year, since]
+
         # --- Define the Spatial Aggregation Query (Direct Join) ---
+        # The aggregation is wrapped in a CTE and DuckDB assembles the whole FeatureCollection
+        # itself (json_object/to_json(list(...))), so the result is a single string written to disk.
         query = f"""
+        WITH agg AS (
+            SELECT
+                mb.municipality_name,
+                mb.province_name,
+                mb.psgc_code,
+                SUM(md.losses_php_grand_total) AS total_loss_php,
+                COUNT(*) AS incident_count,
+                -- Add other aggregations: SUM(md.farmers_affected), AVG(md.area_total_affected_ha), etc.
+                any_value(mb.geom_geojson) AS geom_geojson -- One shape per municipality; kept out of the group key
+            FROM main_disasters_df md
+            JOIN municipal_boundaries mb -- Join directly with municipal boundaries
+              ON {join_condition}
+            {where_sql}
+            GROUP BY
+                mb.province_name,
+                mb.municipality_name,
+                mb.psgc_code -- Narrow keys only; hashing the polygon text per group is avoided
+        )
         SELECT
-            mb.municipality_name,
-            mb.province_name,
-            mb.psgc_code,
-            SUM(md.losses_php_grand_total) AS total_loss_php,
-            COUNT(*) AS incident_count,
-            -- Add other aggregations: SUM(md.farmers_affected), AVG(md.area_total_affected_ha), etc.
-            ST_AsGeoJSON(mb.geom) AS geometry_geojson -- Use 'geom' here
-        FROM main_disasters_df md
-        JOIN municipal_boundaries mb -- Join directly with municipal boundaries
-          ON {join_condition}
-        -- WHERE clauses for filtering (apply to 'md' table)
-        -- e.g., WHERE md.year >= 2020
-        GROUP BY
-            mb.province_name,
-            mb.municipality_name,
-            mb.psgc_code,
-            mb.geom -- Group by the municipality geometry using 'geom'
-        ORDER BY
-            mb.province_name,
-            mb.municipality_name;
+            json_object(
+                'type', 'FeatureCollection',
+                'features', COALESCE(to_json(list(
+                    json_object(
+                        'type', 'Feature',
+                        'geometry', geom_geojson::JSON, -- Embedded as JSON, not re-quoted as a string
+                        'properties', json_object(
+                            'municipality_name', municipality_name,
+                            'province_name', province_name,
+                            'psgc_code', psgc_code,
+                            'total_loss_php', CASE WHEN isfinite(total_loss_php) THEN total_loss_php END, -- NaN/inf -> null (not valid JSON)
+                            'incident_count', incident_count
+                        )
+                    )
+                    ORDER BY province_name, municipality_name
+                )), '[]'::JSON) -- list() keeps the ORDER BY; empty result -> []
+            ) AS feature_collection,
+            COUNT(*) AS feature_count
+        FROM agg
+        WHERE geom_geojson IS NOT NULL;
         """
 
         print("Executing spatial aggregation query (Municipalities)...")
-        results_df = con.sql(query).df()
-        print(f"Query returned {len(results_df)} aggregated municipalities.")
-
-        # --- Convert results to GeoJSON FeatureCollection ---
-        geojson_output = df_to_geojson(results_df, geometry_col='geometry_geojson')
+        feature_collection_str, feature_count = con.execute(query, query_params).fetchone()
+        print(f"Query returned {feature_count} aggregated municipalities.")
 
         # --- Save GeoJSON to API output file ---
         os.makedirs(api_output_dir, exist_ok=True)
         with open(api_output_abs_path, 'w') as f:
-            json.dump(geojson_output, f, indent=2)
+            f.write(feature_collection_str)
         print(f"Successfully exported aggregated GeoJSON data to '{api_output_abs_path}'")
 
     # --- Error Handling ---
@@ -437,10 +694,6 @@ def handle_export():
     except Exception as e:
         print(f"UNEXPECTED ERROR during export: {e}")
         import traceback; traceback.print_exc()
-    finally:
-        if con:
-            con.close()
-            print("Closed DuckDB connection.")
 
     print("--- Export Complete ---")
 
@@ -454,13 +707,19 @@ if __name__ == "__main__":
                               help="Force write mode: 'overwrite' to replace MAIN table (use carefully!), defaults to 'append'.")
 
     export_parser = subparsers.add_parser('export', help="Analyze the MAIN lakehouse table with Municipality GIS data and export results for the API.")
+    export_parser.add_argument('--since', type=date.fromisoformat, default=None, metavar='YYYY-MM-DD',
+                              help="Only export events starting on or after this date (skips older year partitions).")
+
+    subparsers.add_parser('bake-boundaries', help="Parse the municipal boundaries GeoJSON once and save the shapes as Parquet for faster exports.")
 
     args = parser.parse_args()
 
     if args.command == 'import':
         handle_import(args.mode)
     elif args.command == 'export':
-        handle_export()
+        handle_export(args.since)
+    elif args.command == 'bake-boundaries':
+        handle_bake_boundaries()
     else:
         parser.print_help()
 
@@ -1,8 +1,22 @@
 import pandas as pd
+import numpy as np
 import os
 import re
+import glob
+import tempfile
+import zlib
 from datetime import datetime
-from calendar import monthrange
+from calendar import month_name
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv # Optional: multi-threaded C++ CSV writer for the outputs
+except ImportError:
+    pacsv = None
+try:
+    import python_calamine # Optional: Rust-based .xlsx reader, far faster than openpyxl
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
 
 # --- CONFIGURATION ---
 INPUT_FILENAME = 'source_data.xlsx'
@@ -11,6 +25,7 @@ OUTPUT_DIR = 'exported'
 CLEAN_OUTPUT_FILENAME = 'clean_data.csv'
 ERROR_OUTPUT_FILENAME = 'erroneous_rows.csv'
 PSGC_LOOKUP_FILENAME = 'psgc_lookup.csv' # PSGC Lookup file
+CSV_CHUNK_ROWS = 65536 # Rows rendered per batch when writing the output CSVs (bounds peak memory)
 
 # This mapping is updated based on sanitizer_test.py
 COLUMN_MAPPING = {
@@ -43,15 +58,165 @@ municipality_replacements = {
     # Add more known variations here if needed
 }
 
+# --- Date Parsing ---
+# Lowercase full month name -> month number, as accepted by strptime's %B
+MONTH_NAME_TO_NUM = {name.lower(): num for num, name in enumerate(month_name) if name}
+DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31) # February in a common year
+# Remark for dates that parse but fall outside what pandas can store (datetime64[ns])
+OUT_OF_RANGE_REMARK = f"Invalid date: outside the supported range ({pd.Timestamp.min.date()} to {pd.Timestamp.max.date()})."
+# Compiled once at import; shared by the per-row parser and the column-wise parse_date_column
+RE_MONTH_DAY_RANGE = re.compile(r'^([a-zA-Z]+)\s+(\d{1,2})(?:\s*-\s*(\d{1,2}))?,\s*(\d{4})$', re.IGNORECASE) # "Month Day[-Day], Year"
+RE_MONTH_MONTH_YEAR = re.compile(r'^(\w+)-(\w+)\s+(\d{4})', re.IGNORECASE) # "Month-Month Year"
+RE_MONTH_YEAR = re.compile(r'^(\w+)\s+(\d{4})$', re.IGNORECASE) # "Month Year"
+RE_ISO = re.compile(r'^\d{4}-\d{2}-\d{2}(?:\s+\d{2}:\d{2}:\d{2})?$') # "YYYY-MM-DD[ HH:MM:SS]"
+RE_SPLIT = re.compile(r'\s*-\s*|\s+to\s+', re.IGNORECASE) # Range separators
+RE_YEAR4 = re.compile(r'(\d{4})')
+RE_STRIP_YEAR = re.compile(r'\s*,?\s*\d{4}')
+RE_COMMODITY_PREFIX = re.compile(r'^\d+\s*-\s*') # Leading commodity code, e.g. "01 - "
+RE_MONTH_NAME_DAY = re.compile(r'(\w+)\s+(3[01]|[12]\d|0[1-9]|[1-9])') # strptime's "%B %d"
+
 
 def clean_numeric_column(series):
-    """ Cleans a pandas Series expecting numeric data. Handles commas, hyphens, and errors. """
-    series_str = series.astype(str)
+    """
+    Cleans a pandas Series expecting numeric data. Handles commas, hyphens, and errors.
+    Columns Excel already typed as numbers skip the string round-trip entirely; in mixed columns
+    only the non-number cells (e.g. '-', '1,234') are cleaned as text.
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.fillna(0)
+    is_number = series.map(type).isin([int, float]) # bool is its own type, so True/False are text here
+    series_str = series[~is_number].astype(str)
     series_cleaned = series_str.str.replace(',', '', regex=False).str.strip().replace('-', '0', regex=False)
-    series_numeric = pd.to_numeric(series_cleaned, errors='coerce')
+    series_numeric = pd.to_numeric(series.where(is_number, series_cleaned), errors='coerce')
     return series_numeric.fillna(0)
 
 
+def clean_text_column(series, clean):
+    """
+    Runs a text clean-up once per distinct value instead of once per row. `clean` takes a Series of
+    strings and returns the cleaned strings (None for missing). Returns a categorical Series.
+    """
+    values = series.astype('category')
+    cleaned = clean(pd.Series(values.cat.categories, dtype=object)).to_numpy(dtype=object)
+    # The extra trailing None is what code -1 (missing) picks up
+    codes, categories = pd.factorize(np.append(cleaned, None))
+    return pd.Series(pd.Categorical.from_codes(codes[values.cat.codes.to_numpy()], categories=categories),
+                     index=series.index, name=series.name)
+
+
+def read_sheet_cached(input_path, sheet_name):
+    """
+    Loads the mapped columns of the sheet (header on row 2), dropping rows with none of them filled.
+    Only the mapped columns are parsed (matched on stripped header names, as renamed later);
+    'Unnamed' and other extra columns are never built.
+    The result is cached next to the workbook, keyed by its modification time and the mapped
+    columns, so re-runs on an unchanged file skip read_excel. Pickle rather than Parquet: the raw
+    columns mix dates, numbers and text cell by cell, and the date parsing depends on those types.
+    An unreadable cache is deleted and rebuilt; older caches of the same sheet are removed.
+    """
+    source_columns = {name.strip() for name in COLUMN_MAPPING}
+    columns_key = format(zlib.crc32('|'.join(sorted(source_columns)).encode('utf-8')), '08x') # Changes with COLUMN_MAPPING
+    cache_path = f"{input_path}.{os.stat(input_path).st_mtime_ns}.{columns_key}.{sheet_name}.pkl"
+    if os.path.exists(cache_path):
+        try:
+            df = pd.read_pickle(cache_path)
+            print(f"Using cached copy of the sheet: '{cache_path}'.")
+            return df
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable sheet cache '{cache_path}': {e}")
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    df = pd.read_excel(input_path, sheet_name=sheet_name, header=1, engine=EXCEL_ENGINE,
+                       usecols=lambda name: str(name).strip() in source_columns)
+    df = df.dropna(how='all')
+
+    # Written under a temporary name and renamed, so an interrupted run never leaves a partial cache
+    temp_path = None
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or '.', prefix='.sheet-cache-', suffix='.tmp')
+        os.close(fd)
+        df.to_pickle(temp_path)
+        os.replace(temp_path, cache_path)
+        temp_path = None
+        for stale_path in glob.glob(f"{glob.escape(input_path)}.*.{glob.escape(sheet_name)}.pkl"):
+            if stale_path != cache_path:
+                os.remove(stale_path)
+    except OSError as e:
+        print(f"Warning: Could not cache the loaded sheet to '{cache_path}': {e}")
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+    return df
+
+
+def write_csv(df, path):
+    """
+    Writes a DataFrame as UTF-8 CSV with a BOM (so Excel shows 'Ñ' correctly), like
+    to_csv(index=False, encoding='utf-8-sig'). Uses pyarrow's C++ writer when available;
+    empty strings are written as empty fields, the same as missing values.
+    Rows are written CSV_CHUNK_ROWS at a time, so only one batch is rendered in memory.
+    """
+    chunk_starts = range(0, max(len(df), 1), CSV_CHUNK_ROWS) # An empty frame still gets its header
+    if pacsv is None:
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            for start in chunk_starts:
+                df.iloc[start:start + CSV_CHUNK_ROWS].to_csv(f, index=False, header=(start == 0))
+        return
+    schema = pa.Schema.from_pandas(df, preserve_index=False) # Fixed up front so every batch matches
+    text_cols = df.columns[df.dtypes == object]
+    with open(path, 'wb') as f:
+        f.write('\ufeff'.encode('utf-8'))
+        with pacsv.CSVWriter(f, schema) as writer:
+            for start in chunk_starts:
+                chunk = df.iloc[start:start + CSV_CHUNK_ROWS].copy()
+                for col in text_cols:
+                    chunk[col] = chunk[col].where(chunk[col] != '', None)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def last_day_of_month(year, month):
+    """ Same as calendar.monthrange(year, month)[1], without computing the weekday. """
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return 29
+    return DAYS_IN_MONTH[month - 1]
+
+
+def month_number(month_str):
+    """
+    Month number for a full month name (case-insensitive, like strptime's %B).
+    Raises ValueError for anything else, including abbreviations.
+    """
+    try:
+        return MONTH_NAME_TO_NUM[month_str.lower()]
+    except KeyError:
+        raise ValueError(f"Invalid month name: '{month_str}'") from None
+
+
+def month_year_date(month_str, year_val, day=1):
+    """
+    Same as datetime.strptime(f"{month_str} {day} {year_val}", "%B %d %Y").date(), without strptime.
+    """
+    if not 1000 <= year_val <= 9999: # %Y needs four digits
+        raise ValueError(f"Invalid year: {year_val}")
+    return datetime(year_val, month_number(month_str), int(day)).date()
+
+
+def month_day_date(text, year):
+    """
+    Same as datetime.strptime(text, "%B %d").replace(year=year).date(), without strptime.
+    The day is checked against strptime's default year 1900 first, so 'February 29' is rejected.
+    """
+    match = RE_MONTH_NAME_DAY.fullmatch(text)
+    if not match:
+        raise ValueError(f"'{text}' is not a 'Month Day' value")
+    month_num, day = month_number(match.group(1)), int(match.group(2))
+    datetime(1900, month_num, day)
+    return datetime(year, month_num, day).date()
+
+
 def parse_date_range_smart(date_str, year_original_val):
     """
     Smarter date parser that handles various inconsistent formats and returns a remark.
@@ -85,11 +250,14 @@ def parse_date_range_smart(date_str, year_original_val):
 
     try:
         # Pattern 1 & 4 Combined: "Month Day, Year" OR "Month Day-Day, Year"
-        match = re.match(r'^([a-zA-Z]+)\s+(\d{1,2})(?:\s*-\s*(\d{1,2}))?,\s*(\d{4})$', date_str, re.IGNORECASE)
+        # Each pattern is only tried when the string has the character it cannot match without
+        # (',' / '-' / a leading digit), so most rows cost a single regex call
+        has_dash = '-' in date_str
+        match = RE_MONTH_DAY_RANGE.match(date_str) if ',' in date_str else None
         if match:
             month_str, start_day, end_day, year_from_str = match.groups()
             year_val = int(year_from_str)
-            start_date = datetime.strptime(f"{month_str} {start_day} {year_val}", "%B %d %Y").date()
+            start_date = month_year_date(month_str, year_val, start_day)
             if end_day:
                 end_date = start_date.replace(day=int(end_day))
                 remark = "Parsed from 'Month Day-Day, Year' format."
@@ -101,34 +269,34 @@ def parse_date_range_smart(date_str, year_original_val):
             return start_date, end_date, remark
 
         # Pattern 2: "Month-Month Year" e.g., "July-August 2021"
-        match = re.match(r'(\w+)-(\w+)\s+(\d{4})', date_str, re.IGNORECASE)
+        match = RE_MONTH_MONTH_YEAR.match(date_str) if has_dash else None
         if match:
             start_month_str, end_month_str, year_from_str = match.groups()
             year_val = int(year_from_str)
             if fallback_year is not None and abs(year_val - fallback_year) > 1:
                  return None, None, f"Year in date string ({year_val}) differs significantly from Year column ({fallback_year})."
-            start_date = datetime.strptime(f"{start_month_str} 1 {year_val}", "%B %d %Y").date()
-            end_month_dt = datetime.strptime(f"{end_month_str} 1 {year_val}", "%B %d %Y")
-            last_day = monthrange(end_month_dt.year, end_month_dt.month)[1]
-            end_date = end_month_dt.replace(day=last_day).date()
+            start_date = month_year_date(start_month_str, year_val)
+            end_month_date = month_year_date(end_month_str, year_val)
+            last_day = last_day_of_month(end_month_date.year, end_month_date.month)
+            end_date = end_month_date.replace(day=last_day)
             remark = "Parsed from month-only range; assumed full month coverage."
             return start_date, end_date, remark
 
         # Pattern 3: "Month Year" e.g., "November 2012"
-        match = re.match(r'(\w+)\s+(\d{4})$', date_str, re.IGNORECASE)
-        if match and '-' not in date_str and 'to' not in date_str.lower():
+        match = None if has_dash else RE_MONTH_YEAR.match(date_str)
+        if match and 'to' not in date_str.lower():
             month_str, year_from_str = match.groups()
             year_val = int(year_from_str)
             if fallback_year is not None and abs(year_val - fallback_year) > 1:
                  return None, None, f"Year in date string ({year_val}) differs significantly from Year column ({fallback_year})."
-            start_date = datetime.strptime(f"{month_str} 1 {year_val}", "%B %d %Y").date()
-            last_day = monthrange(start_date.year, start_date.month)[1]
+            start_date = month_year_date(month_str, year_val)
+            last_day = last_day_of_month(start_date.year, start_date.month)
             end_date = start_date.replace(day=last_day)
             remark = "Parsed from month-only value; assumed full month."
             return start_date, end_date, remark
 
         # --- Fallback to pd.to_datetime ---
-        if re.match(r'^\d{4}-\d{2}-\d{2}(?:\s+\d{2}:\d{2}:\d{2})?$', date_str):
+        if date_str[:1].isdigit() and RE_ISO.match(date_str):
             dt_obj = pd.to_datetime(date_str, errors='coerce')
             if not pd.isna(dt_obj):
                 date = dt_obj.date()
@@ -139,52 +307,52 @@ def parse_date_range_smart(date_str, year_original_val):
 
         # --- Final fallback ---
         if fallback_year is None:
-             year_match_in_str = re.search(r'(\d{4})', date_str)
+             year_match_in_str = RE_YEAR4.search(date_str)
              if year_match_in_str:
                   fallback_year = int(year_match_in_str.group(1))
              else:
                   return None, None, "Missing Year column value and could not extract year from date string."
 
-        parts = re.split(r'\s*-\s*|\s+to\s+', date_str, flags=re.IGNORECASE)
+        parts = RE_SPLIT.split(date_str)
         start_str, end_str = parts[0], parts[-1]
         remark_parts = []
 
         # Process Start String
-        match_start_year = re.search(r'(\d{4})', start_str)
+        match_start_year = RE_YEAR4.search(start_str)
         start_year = int(match_start_year.group(1)) if match_start_year else fallback_year
-        start_str_clean = re.sub(r'\s*,?\s*\d{4}', '', start_str).strip()
+        start_str_clean = RE_STRIP_YEAR.sub('', start_str).strip()
         try:
-            start_date = datetime.strptime(start_str_clean, "%B %d").replace(year=start_year).date()
+            start_date = month_day_date(start_str_clean, start_year)
         except ValueError:
             try:
-                start_date = datetime.strptime(start_str_clean, "%B").replace(year=start_year, day=1).date()
+                start_date = datetime(start_year, month_number(start_str_clean), 1).date()
                 remark_parts.append("Start date assumed as 1st of month.")
             except ValueError:
                 return None, None, "Invalid start month name"
 
         # Process End String
-        match_end_year = re.search(r'(\d{4})', end_str)
+        match_end_year = RE_YEAR4.search(end_str)
         end_year = int(match_end_year.group(1)) if match_end_year else start_year
-        end_str_clean = re.sub(r'\s*,?\s*\d{4}', '', end_str).strip()
+        end_str_clean = RE_STRIP_YEAR.sub('', end_str).strip()
         if len(parts) == 1:
             end_date = start_date
             if not ("Start date assumed" in " ".join(remark_parts) and start_str_clean == end_str_clean):
                  remark_parts.append("Parsed as a single day event.")
-        elif len(end_str_clean.split()) == 1 and end_str_clean.isdigit():
+        elif end_str_clean.isdigit(): # A bare day number (isdigit() already rules out spaces)
              try:
-                 datetime.strptime(start_str_clean, "%B %d")
+                 month_day_date(start_str_clean, 1900)
                  end_date = start_date.replace(day=int(end_str_clean))
                  remark_parts.append("Parsed as a date range within the same month.")
              except ValueError:
                   return None, None, "Ambiguous range (Month to Day)"
         else:
             try:
-                end_date = datetime.strptime(end_str_clean, "%B %d").replace(year=end_year).date()
+                end_date = month_day_date(end_str_clean, end_year)
             except ValueError:
                 try:
-                    end_month_dt = datetime.strptime(end_str_clean, "%B").replace(year=end_year)
-                    last_day = monthrange(end_month_dt.year, end_month_dt.month)[1]
-                    end_date = end_month_dt.replace(day=last_day).date()
+                    end_month_num = month_number(end_str_clean)
+                    last_day = last_day_of_month(end_year, end_month_num)
+                    end_date = datetime(end_year, end_month_num, last_day).date()
                     remark_parts.append("End date assumed as last day of month.")
                 except ValueError:
                     return None, None, "Invalid end month name"
@@ -201,6 +369,129 @@ def parse_date_range_smart(date_str, year_original_val):
         return None, None, None
 
 
+def parse_date_column(date_series, year_original_series):
+    """
+    Vectorized counterpart of parse_date_range_smart for a whole column.
+    The common shapes ("Month Day[-Day], Year", "Month-Month Year", "Month Year", ISO timestamps
+    and native Excel dates) are parsed column-wise with str.extract and to_datetime; rows these
+    cannot settle cleanly (other layouts, invalid dates, year drift) go through
+    parse_date_range_smart so the results and remarks are identical to the per-row parser.
+    Each distinct (date, Year) pair is parsed only once and the result is broadcast to its rows.
+    Returns (start_dates, end_dates, remarks) as numpy arrays aligned with date_series.
+    """
+    # Free-text dates repeat heavily (every row of one event carries the same text), so only the
+    # first row of each distinct (date, Year) pair is parsed. The value's type is part of the key
+    # because equal values of different types can parse differently (str(2013) vs str(2013.0)).
+    pair_ids = pd.DataFrame({
+        'date': date_series, 'date_type': date_series.map(type), 'year': year_original_series,
+    }).groupby(['date', 'date_type', 'year'], dropna=False, sort=False).ngroup()
+    first_rows = pair_ids.drop_duplicates()
+    date_series = date_series.loc[first_rows.index]
+    year_original_series = year_original_series.loc[first_rows.index]
+
+    index = date_series.index
+    is_missing = date_series.isna()
+    is_native = date_series.map(lambda v: isinstance(v, datetime)).astype(bool)
+    is_text = ~is_missing & ~is_native
+    text = date_series.where(is_text).astype(str).str.strip()
+    text_lower = text.str.lower()
+
+    # int(year_original_val) truncates; non-finite years are left to the per-row parser
+    year_original = pd.to_numeric(year_original_series, errors='coerce')
+    year_check = np.trunc(year_original)
+    year_usable = year_original.isna() | np.isfinite(year_original)
+
+    def year_ok(year_val):
+        """ True where the parsed year is within one year of the Year column (or that is empty). """
+        return year_original.isna() | ((year_val - year_check).abs() <= 1)
+
+    def build_dates(year_val, month_num, day_val):
+        return pd.to_datetime(pd.DataFrame({'year': year_val, 'month': month_num, 'day': day_val}, index=index), errors='coerce')
+
+    # Pattern 1 & 4: "Month Day, Year" OR "Month Day-Day, Year"
+    p1 = text.str.extract(RE_MONTH_DAY_RANGE)
+    is_p1 = is_text & p1[0].notna()
+    p1_year = pd.to_numeric(p1[3], errors='coerce')
+    p1_month = p1[0].str.lower().map(MONTH_NAME_TO_NUM)
+    p1_start = build_dates(p1_year, p1_month, pd.to_numeric(p1[1], errors='coerce'))
+    p1_is_range = p1[2].notna()
+    p1_end = build_dates(p1_year, p1_month, pd.to_numeric(p1[2].where(p1[2].notna(), p1[1]), errors='coerce'))
+
+    # Pattern 2: "Month-Month Year" e.g., "July-August 2021"
+    p2 = text.str.extract(RE_MONTH_MONTH_YEAR)
+    is_p2 = is_text & ~is_p1 & p2[0].notna()
+    p2_year = pd.to_numeric(p2[2], errors='coerce')
+    p2_start = build_dates(p2_year, p2[0].str.lower().map(MONTH_NAME_TO_NUM), 1)
+    p2_end_month_num = p2[1].str.lower().map(MONTH_NAME_TO_NUM)
+    # Month ends are built, not added as offsets, so months past the Timestamp limit become NaT
+    # (and go to the per-row parser) instead of overflowing
+    p2_end = build_dates(p2_year, p2_end_month_num, build_dates(p2_year, p2_end_month_num, 1).dt.days_in_month)
+
+    # Pattern 3: "Month Year" e.g., "November 2012"
+    p3 = text.str.extract(RE_MONTH_YEAR)
+    is_p3 = (is_text & ~is_p1 & ~is_p2 & p3[0].notna()
+             & ~text.str.contains('-', regex=False) & ~text_lower.str.contains('to', regex=False))
+    p3_year = pd.to_numeric(p3[1], errors='coerce')
+    p3_month = p3[0].str.lower().map(MONTH_NAME_TO_NUM)
+    p3_start = build_dates(p3_year, p3_month, 1)
+    p3_end = build_dates(p3_year, p3_month, p3_start.dt.days_in_month)
+
+    # Standard timestamp strings, e.g. "2017-10-12 00:00:00"
+    is_iso = (is_text & ~is_p1 & ~is_p2 & ~is_p3
+              & text.str.match(RE_ISO))
+    iso_dates = pd.to_datetime(text.where(is_iso), format='ISO8601', errors='coerce').dt.normalize()
+
+    # Native Excel dates
+    native_dates = pd.to_datetime(date_series.where(is_native), errors='coerce').dt.normalize()
+
+    p1_done = is_p1 & p1_start.notna() & p1_end.notna() & year_ok(p1_year)
+    p2_done = is_p2 & p2_start.notna() & p2_end.notna() & year_ok(p2_year)
+    p3_done = is_p3 & p3_start.notna() & p3_end.notna() & year_ok(p3_year)
+    iso_done = is_iso & iso_dates.notna() & year_ok(iso_dates.dt.year)
+    native_done = is_native & native_dates.notna() & year_ok(native_dates.dt.year)
+
+    conditions = [(p1_done & p1_is_range).to_numpy(), p1_done.to_numpy(), p2_done.to_numpy(),
+                  p3_done.to_numpy(), iso_done.to_numpy(), native_done.to_numpy()]
+    # One pre-allocated array per output, filled by np.select and then by the per-row parser
+    start_dates = np.select(conditions, [p1_start, p1_start, p2_start, p3_start, iso_dates, native_dates],
+                            default=np.datetime64('NaT')).astype('datetime64[ns]')
+    end_dates = np.select(conditions, [p1_end, p1_end, p2_end, p3_end, iso_dates, native_dates],
+                          default=np.datetime64('NaT')).astype('datetime64[ns]')
+    remarks = np.select(conditions, [
+        "Parsed from 'Month Day-Day, Year' format.",
+        "Parsed as a single day event.",
+        "Parsed from month-only range; assumed full month coverage.",
+        "Parsed from month-only value; assumed full month.",
+        "Parsed from a standard timestamp format.",
+        "Parsed from a native Excel date format.",
+    ], default=None).astype(object)
+
+    # Everything else (free-form ranges, invalid dates, year drift) keeps the per-row parser
+    # Its dates are collected and converted with one to_datetime call per column.
+    row_parser_pos = np.flatnonzero(~is_missing.to_numpy() & (~np.logical_or.reduce(conditions) | ~year_usable.to_numpy()))
+    row_parser_results = [parse_date_range_smart(date_str, year_val) for date_str, year_val
+                          in zip(date_series.iloc[row_parser_pos].tolist(), year_original_series.iloc[row_parser_pos].tolist())]
+    if row_parser_results:
+        row_starts, row_ends, row_remarks = (pd.Series(values, dtype=object) for values in zip(*row_parser_results))
+        row_start_dates = pd.to_datetime(row_starts, errors='coerce')
+        row_end_dates = pd.to_datetime(row_ends, errors='coerce')
+        # A parsed date that datetime64[ns] cannot hold (outside 1677-09-21..2262-04-11) fails the row
+        # rather than leaving a one-sided range with a success remark
+        out_of_range = ((row_starts.notna() & row_start_dates.isna()) | (row_ends.notna() & row_end_dates.isna())).to_numpy()
+        row_start_dates[out_of_range] = pd.NaT
+        row_end_dates[out_of_range] = pd.NaT
+        row_remarks[out_of_range] = OUT_OF_RANGE_REMARK
+        start_dates[row_parser_pos] = row_start_dates.to_numpy(dtype='datetime64[ns]')
+        end_dates[row_parser_pos] = row_end_dates.to_numpy(dtype='datetime64[ns]')
+        remarks[row_parser_pos] = row_remarks.to_numpy()
+
+    # Broadcast each pair's result to all of its rows
+    parsed_pos_of_pair = np.empty(len(first_rows), dtype=np.intp)
+    parsed_pos_of_pair[first_rows.to_numpy()] = np.arange(len(first_rows))
+    row_pos = parsed_pos_of_pair[pair_ids.to_numpy()]
+    return start_dates[row_pos], end_dates[row_pos], remarks[row_pos]
+
+
 def sanitize_data(input_filename, sheet_name, output_dir, clean_filename, error_filename, psgc_lookup_filename):
     """ Main function to orchestrate the data sanitation process, including PSGC lookup. """
     try:
@@ -226,7 +517,7 @@ def sanitize_data(input_filename, sheet_name, output_dir, clean_filename, error_
          print(f"Warning: PSGC Lookup file not found at '{psgc_lookup_path}'. PSGC codes will not be added.")
     else:
         try:
-            psgc_lookup_df = pd.read_csv(psgc_lookup_path)
+            psgc_lookup_df = pd.read_csv(psgc_lookup_path, engine='pyarrow' if pacsv is not None else 'c')
             required_psgc_cols = ['province_name', 'municipality_name', 'psgc_code']
             if not all(col in psgc_lookup_df.columns for col in required_psgc_cols):
                 print(f"Error: PSGC Lookup file '{psgc_lookup_filename}' is missing required columns: {required_psgc_cols}. Skipping PSGC lookup.")
@@ -242,17 +533,16 @@ def sanitize_data(input_filename, sheet_name, output_dir, clean_filename, error_
             psgc_lookup_df = None
 
     try:
-        df = pd.read_excel(input_path, sheet_name=sheet_name, header=1, engine='openpyxl')
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-        df = df.dropna(how='all')
+        df = read_sheet_cached(input_path, sheet_name)
         original_row_count = len(df)
         print(f"Loaded {original_row_count} rows from sheet '{sheet_name}'.")
     except ValueError as e:
         print(f"Error reading Excel sheet: {e}. Make sure a sheet named '{sheet_name}' exists.")
         return
 
-    df_original_structure = df.copy()
-    df_original_structure['source_row_number'] = df.index + 3
+    # Only the raw cells quoted in error messages are kept aside (not a copy of the whole sheet);
+    # the sheet row number is derived from the index (header=1, so data starts on row 3).
+    df_original_structure = df[['YEAR (DATE OF OCCURENCE)', 'ACTUAL DATE OF OCCURENCE']]
 
     # Use original 'year' column name from mapping for initial processing
     original_year_col_name = 'YEAR (DATE OF OCCURENCE)' # Get original name from source
@@ -285,30 +575,23 @@ def sanitize_data(input_filename, sheet_name, output_dir, clean_filename, error_
     for col in string_cols_to_upper:
         if col in df_processed.columns:
             # Convert to string, replacing actual NaN values before upper(), then strip
-            # Convert NaN to empty string temporarily for upper(), then back to None
-            df_processed[col] = df_processed[col].fillna('').astype(str).str.upper().str.strip()
-            df_processed[col] = df_processed[col].replace({'^$': None, 'NAN': None}, regex=True) # Use None for missing
+            # Convert NaN to empty string temporarily for upper(), then back to None.
+            # These columns have few distinct values, so they are kept as categoricals from here on.
+            df_processed[col] = clean_text_column(
+                df_processed[col].fillna('').astype(str),
+                lambda values: values.str.upper().str.strip().replace({'^$': None, 'NAN': None}, regex=True)) # Use None for missing
 
 
     # --- PSGC Lookup/Merge ---
     if psgc_lookup_df is not None:
          print("Performing PSGC lookup...")
          if 'province' in df_processed.columns and 'municipality' in df_processed.columns:
-              # Ensure join keys are strings for merge robustness, handle None
-              df_processed['province_join_key'] = df_processed['province'].fillna('').astype(str)
-              df_processed['municipality_join_key'] = df_processed['municipality'].fillna('').astype(str)
-              psgc_lookup_df['province_name'] = psgc_lookup_df['province_name'].astype(str)
-              psgc_lookup_df['municipality_name'] = psgc_lookup_df['municipality_name'].astype(str)
-
-              df_processed = pd.merge(
-                   df_processed,
-                   psgc_lookup_df,
-                   left_on=['province_join_key', 'municipality_join_key'],
-                   right_on=['province_name', 'municipality_name'],
-                   how='left'
-              )
-              # Clean up join keys and redundant columns
-              df_processed = df_processed.drop(columns=['province_name', 'municipality_name', 'province_join_key', 'municipality_join_key'], errors='ignore')
+              # Plain dict lookup on (province, municipality); unlike a merge this keeps the row index.
+              # Missing names never match (the lookup keys are all strings).
+              psgc_map = dict(zip(zip(psgc_lookup_df['province_name'].astype(str), psgc_lookup_df['municipality_name'].astype(str)),
+                                  psgc_lookup_df['psgc_code']))
+              df_processed['psgc_code'] = pd.Series([psgc_map.get(key) for key in zip(df_processed['province'], df_processed['municipality'])],
+                                                    index=df_processed.index, dtype=object)
               print("PSGC lookup complete.")
          else:
               print("Warning: 'province' or 'municipality' column not found after renaming. Skipping PSGC lookup.")
@@ -329,104 +612,111 @@ def sanitize_data(input_filename, sheet_name, output_dir, clean_filename, error_
 
     # Clean commodity codes AFTER converting to upper
     if 'commodity' in df_processed.columns:
-        df_processed['commodity'] = df_processed['commodity'].astype(str).str.replace(r'^\d+\s*-\s*', '', regex=True).str.strip()
         # Handle potential empty strings after stripping code, keep as None
-        df_processed['commodity'] = df_processed['commodity'].replace({'^$': None, 'NAN': None}, regex=True)
+        df_processed['commodity'] = clean_text_column(
+            df_processed['commodity'],
+            lambda values: values.str.replace(RE_COMMODITY_PREFIX, '', regex=True).str.strip().replace({'^$': None, 'NAN': None}, regex=True))
 
 
-    parsed_dates = df_processed.apply(lambda row: parse_date_range_smart(row.get('date_range_str'), row.get('year_original')), axis=1)
-    df_processed[['temp_start', 'temp_end', 'sanitation_remarks']] = pd.DataFrame(parsed_dates.tolist(), index=df_processed.index)
-    df_processed['event_date_start'] = pd.to_datetime(df_processed['temp_start'], errors='coerce')
-    df_processed['event_date_end'] = pd.to_datetime(df_processed['temp_end'], errors='coerce')
-    df_processed = df_processed.drop(columns=['temp_start', 'temp_end'])
+    start_dates, end_dates, remarks = parse_date_column(df_processed['date_range_str'], df_processed['year_original'])
+    df_processed['sanitation_remarks'] = remarks
+    df_processed['event_date_start'] = start_dates
+    df_processed['event_date_end'] = end_dates
 
     # Derive 'year' from event_date_start AFTER parsing
     df_processed['year'] = df_processed['event_date_start'].dt.year
     df_processed['year'] = df_processed['year'].astype('Int64') # Use nullable integer
 
     # --- Validation ---
-    error_reasons = []
-    processed_indices = df_processed.index
-    for index, row in df_processed.iterrows():
-        reasons = []
-        year_original_val, start_date, end_date = row.get('year_original'), row.get('event_date_start'), row.get('event_date_end')
-        psgc_val = row.get('psgc_code')
-        province_val = row.get('province')
-        municipality_val = row.get('municipality')
-
-        # Basic Validation
-        # Check for None or empty string after potential cleaning
-        if pd.isna(province_val) or str(province_val).strip() == '': reasons.append("Missing essential field (province).")
-        if pd.isna(municipality_val) or str(municipality_val).strip() == '': reasons.append("Missing essential field (municipality).")
-        if pd.isna(year_original_val):
-            original_year_str = df_original_structure.loc[index, 'YEAR (DATE OF OCCURENCE)']
-            reasons.append(f"Original Year column is not a valid number: '{original_year_str}'")
-        if pd.isna(start_date):
-            original_date_str = df_original_structure.loc[index, 'ACTUAL DATE OF OCCURENCE']
-            original_date_str = original_date_str if isinstance(original_date_str, (str, int, float)) else str(original_date_str)
-            parse_remark = row.get('sanitation_remarks')
-            error_msg = f"Unparseable date: '{original_date_str}'"
-            if parse_remark and ("Invalid" in parse_remark or "Ambiguous" in parse_remark or "differs significantly" in parse_remark): error_msg += f" ({parse_remark})"
-            reasons.append(error_msg)
-        if row.get('losses_php_grand_total', 0) == 0: reasons.append("Missing or zero Grand Total for PHP loss.")
-
-        # PSGC Validation
-        if pd.isna(psgc_val) and psgc_lookup_df is not None:
-             if not ("Missing essential field" in "; ".join(reasons)):
-                   prov_disp = province_val if pd.notna(province_val) else "MISSING"
-                   mun_disp = municipality_val if pd.notna(municipality_val) else "MISSING"
-                   # Only add error if the fields used for lookup were not missing
-                   if prov_disp != "MISSING" and mun_disp != "MISSING":
-                       reasons.append(f"PSGC code not found for province/municipality: '{prov_disp}' / '{mun_disp}'.")
-
-
-        # Date Logic Validation
-        if pd.notna(start_date) and pd.notna(end_date):
-            if start_date > end_date: reasons.append(f"Date range invalid: Start date ({start_date.date()}) is after end date ({end_date.date()}).")
-
-        # Area Consistency Validation
-        partial, totally, total = row.get('area_partially_damaged_ha', 0), row.get('area_totally_damaged_ha', 0), row.get('area_total_affected_ha', 0)
-        if (partial > 0 or totally > 0) and total > 0 and not abs((partial + totally) - total) < 0.01:
-            reasons.append(f"Area inconsistency: Partial({partial}) + Totally({totally}) != Total({total}).")
-
-        error_reasons.append("; ".join(reasons))
-
-    error_reasons_series = pd.Series(error_reasons, index=processed_indices)
-    df_processed['error_reason'] = error_reasons_series.reindex(df_processed.index)
+    # Each check is a column-wise mask; messages that quote row values are only built for the
+    # flagged rows. Reasons are added check by check (fixed order) and joined with "; ".
+    row_index = df_processed.index
+    no_values = pd.Series(None, index=row_index, dtype=object)
+    zeros = pd.Series(0, index=row_index)
+    province_vals = df_processed.get('province', no_values)
+    municipality_vals = df_processed.get('municipality', no_values)
+    start_dates, end_dates = df_processed['event_date_start'], df_processed['event_date_end']
+
+    def as_text(values):
+        """ str() of each value, as the f-string messages render it. """
+        return pd.Series([str(v) for v in values.tolist()], index=values.index, dtype=object)
+
+    # Basic Validation
+    # Check for None or empty string after potential cleaning
+    # (values are already stripped, and compared per category rather than per row)
+    missing_province = province_vals.isna() | (province_vals == '')
+    missing_municipality = municipality_vals.isna() | (municipality_vals == '')
+    bad_year = df_processed['year_original'].isna()
+    bad_year_messages = "Original Year column is not a valid number: '" + as_text(df_original_structure.loc[row_index[bad_year], 'YEAR (DATE OF OCCURENCE)']) + "'"
+    bad_date = start_dates.isna()
+    bad_date_messages = "Unparseable date: '" + as_text(df_original_structure.loc[row_index[bad_date], 'ACTUAL DATE OF OCCURENCE']) + "'"
+    parse_remarks = df_processed.loc[bad_date, 'sanitation_remarks']
+    show_remark = parse_remarks.notna() & parse_remarks.astype(str).str.contains('Invalid|Ambiguous|differs significantly')
+    bad_date_messages[show_remark] = bad_date_messages[show_remark] + " (" + parse_remarks[show_remark] + ")"
+    zero_grand_total = df_processed.get('losses_php_grand_total', zeros) == 0
+
+    # PSGC Validation (only reported when the fields used for lookup were not missing)
+    missing_psgc = pd.Series(False, index=row_index)
+    if psgc_lookup_df is not None:
+        missing_psgc = (df_processed['psgc_code'].isna() & ~missing_province & ~missing_municipality
+                        & (province_vals != "MISSING") & (municipality_vals != "MISSING"))
+    missing_psgc_messages = ("PSGC code not found for province/municipality: '" + as_text(province_vals[missing_psgc])
+                             + "' / '" + as_text(municipality_vals[missing_psgc]) + "'.")
+
+    # Date Logic Validation
+    dates_reversed = start_dates.notna() & end_dates.notna() & (start_dates > end_dates)
+    dates_reversed_messages = ("Date range invalid: Start date (" + start_dates[dates_reversed].dt.strftime('%Y-%m-%d')
+                               + ") is after end date (" + end_dates[dates_reversed].dt.strftime('%Y-%m-%d') + ").")
+
+    # Area Consistency Validation
+    partial = df_processed.get('area_partially_damaged_ha', zeros)
+    totally = df_processed.get('area_totally_damaged_ha', zeros)
+    total = df_processed.get('area_total_affected_ha', zeros)
+    area_mismatch = ((partial > 0) | (totally > 0)) & (total > 0) & ~(((partial + totally) - total).abs() < 0.01)
+    area_mismatch_messages = ("Area inconsistency: Partial(" + as_text(partial[area_mismatch]) + ") + Totally("
+                              + as_text(totally[area_mismatch]) + ") != Total(" + as_text(total[area_mismatch]) + ").")
+
+    checks = [
+        (missing_province, "Missing essential field (province)."),
+        (missing_municipality, "Missing essential field (municipality)."),
+        (bad_year, bad_year_messages),
+        (bad_date, bad_date_messages),
+        (zero_grand_total, "Missing or zero Grand Total for PHP loss."),
+        (missing_psgc, missing_psgc_messages),
+        (dates_reversed, dates_reversed_messages),
+        (area_mismatch, area_mismatch_messages),
+    ]
+    # Assembled in one object array: each check appends its texts to the flagged slots in a single
+    # numpy operation (message Series are in row order, so positions line up with the mask).
+    error_reasons = np.full(len(row_index), '', dtype=object)
+    for mask, messages in checks:
+        mask = mask.to_numpy(dtype=bool)
+        flagged = error_reasons[mask]
+        messages = messages.to_numpy(dtype=object) if isinstance(messages, pd.Series) else messages
+        error_reasons[mask] = flagged + np.where(flagged == '', '', '; ').astype(object) + messages
+    df_processed['error_reason'] = pd.Series(error_reasons, index=row_index, dtype=object)
 
     # --- Separate Clean and Erroneous Rows ---
     is_erroneous = df_processed['error_reason'].fillna('').astype(str) != ''
-    clean_rows = df_processed[~is_erroneous].copy()
-    erroneous_rows = df_processed[is_erroneous].copy()
-    erroneous_rows = erroneous_rows.merge(
-        df_original_structure[['source_row_number']], left_index=True, right_index=True, how='left'
-    )
 
     # --- Year Comparison Summary (Clean Data) ---
-    if not clean_rows.empty:
-        # Use the derived 'year' column for summary
-        clean_rows['year_int'] = pd.to_numeric(clean_rows['year'], errors='coerce').fillna(0).astype(int)
-        valid_date_rows = clean_rows[clean_rows['event_date_start'].notna() & clean_rows['event_date_end'].notna()]
-        start_year_equal_end_year = valid_date_rows[valid_date_rows['event_date_start'].dt.year == valid_date_rows['event_date_end'].dt.year]
-        start_year_less_than_end_year = valid_date_rows[valid_date_rows['event_date_start'].dt.year < valid_date_rows['event_date_end'].dt.year]
-        count_equal_year, count_span_year = len(start_year_equal_end_year), len(start_year_less_than_end_year)
-        print("\n--- Year Span Summary (Clean Rows Only) ---")
+    print("\n--- Year Span Summary (Clean Rows Only) ---")
+    if not is_erroneous.all():
+        # Rows missing either date compare as False, so they are left out of both counts
+        start_years = df_processed.loc[~is_erroneous, 'event_date_start'].dt.year
+        end_years = df_processed.loc[~is_erroneous, 'event_date_end'].dt.year
+        count_equal_year, count_span_year = int((start_years == end_years).sum()), int((start_years < end_years).sum())
         print(f"Rows where event start/end years are the same: {count_equal_year}")
         print(f"Rows where event spans across calendar years: {count_span_year}")
     else:
-        print("\n--- Year Span Summary (Clean Rows Only) ---")
         print("No clean rows found.")
 
+    # Output formatting is done once on the full frame, before it is split
     # Convert dates to string for output
-    clean_rows['event_date_start'] = clean_rows['event_date_start'].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else '')
-    clean_rows['event_date_end'] = clean_rows['event_date_end'].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else '')
-    erroneous_rows['event_date_start'] = erroneous_rows['event_date_start'].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else '')
-    erroneous_rows['event_date_end'] = erroneous_rows['event_date_end'].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else '')
-    clean_rows['year'] = clean_rows['year'].astype(str).replace('<NA>', '') # Handle potential Nullable Int conversion
-    erroneous_rows['year'] = erroneous_rows['year'].astype(str).replace('<NA>', '')
+    for col in ('event_date_start', 'event_date_end'):
+        df_processed[col] = df_processed[col].dt.strftime('%Y-%m-%d').fillna('') # NaT -> ''
     # Convert psgc_code to string, replacing NaN/None with empty string
-    clean_rows['psgc_code'] = clean_rows['psgc_code'].fillna('').astype(str)
-    erroneous_rows['psgc_code'] = erroneous_rows['psgc_code'].fillna('').astype(str)
+    df_processed['psgc_code'] = df_processed['psgc_code'].fillna('').astype(str)
 
 
     # --- Define Final Columns ---
@@ -439,27 +729,30 @@ def sanitize_data(input_filename, sheet_name, output_dir, clean_filename, error_
         'losses_php_production_cost', 'losses_php_farm_gate', 'losses_php_grand_total',
         'sanitation_remarks'
     ]
-    existing_clean_cols = [col for col in clean_final_columns if col in clean_rows.columns]
-    clean_rows_final = clean_rows[existing_clean_cols]
+    existing_clean_cols = [col for col in clean_final_columns if col in df_processed.columns]
+    clean_rows_final = df_processed.loc[~is_erroneous, existing_clean_cols]
 
     error_final_columns = existing_clean_cols + ['source_row_number', 'error_reason']
-    existing_error_cols = [col for col in error_final_columns if col in erroneous_rows.columns]
+    # Sheet row numbers are only computed for the erroneous rows (the index is the loaded sheet's throughout)
+    erroneous_labels = df_processed.index[is_erroneous]
+    source_row_number = pd.Series(erroneous_labels + 3, index=erroneous_labels)
     # Reorder erroneous rows columns to match the desired output structure
-    erroneous_rows_final = erroneous_rows[existing_error_cols]
+    erroneous_rows_final = df_processed.loc[is_erroneous, existing_clean_cols].assign(
+        source_row_number=source_row_number, error_reason=df_processed.loc[is_erroneous, 'error_reason'])
 
 
     print(f"\nFound {len(clean_rows_final)} clean rows.")
     print(f"Found {len(erroneous_rows_final)} erroneous rows.")
 
     # --- Save Output Files ---
-    clean_rows_final.to_csv(clean_path, index=False, encoding='utf-8-sig')
+    write_csv(clean_rows_final, clean_path)
     print(f"-> Clean data saved to '{clean_path}'")
 
     if not erroneous_rows_final.empty:
-        erroneous_rows_final.to_csv(error_path, index=False, encoding='utf-8-sig')
+        write_csv(erroneous_rows_final, error_path)
         print(f"-> Erroneous rows report saved to '{error_path}'")
     else:
-        pd.DataFrame(columns=error_final_columns).to_csv(error_path, index=False, encoding='utf-8-sig')
+        write_csv(pd.DataFrame(columns=error_final_columns), error_path)
         print(f"-> No erroneous rows found. Empty report saved to '{error_path}'")
 
     print("\n--- Sanitation Complete ---")
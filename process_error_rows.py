@@ -1,4 +1,3 @@
-import pandas as pd
 import duckdb
 from deltalake.writer import write_deltalake
 import os
@@ -29,96 +28,93 @@ FINAL_DELTA_COLUMNS = ESSENTIAL_INPUT_COLUMNS + ['disaster_type_raw', 'sanitatio
 
 
 def process_error_file(file_path):
-    """Reads, validates, cleans types, and processes a single error CSV file with the NEW structure."""
+    """
+    Reads, validates, cleans types, and processes a single error CSV file with the NEW structure.
+    The CSV is parsed and cleaned by DuckDB and handed to write_deltalake as an Arrow table,
+    so the data never goes through pandas objects.
+    """
     print(f"\nProcessing error file: {os.path.basename(file_path)}...")
+    con = duckdb.connect()
     try:
-        # Explicitly set low_memory=False to potentially help with mixed types
-        df_error = pd.read_csv(file_path, low_memory=False)
-    except FileNotFoundError:
-        print(f"ERROR: File not found: {file_path}")
-        return False
-    except Exception as e:
-        print(f"ERROR reading file {os.path.basename(file_path)}: {e}")
-        return False
-
-    if df_error.empty:
-        print("Skipping empty file.")
-        return True # Treat as success for moving file
-
-    # --- <<< START: ESSENTIAL COLUMN CHECK >>> ---
-    print("Checking for essential columns...")
-    current_columns = df_error.columns.tolist()
-    missing_cols = [col for col in ESSENTIAL_INPUT_COLUMNS if col not in current_columns]
-    if missing_cols:
-        print(f"ERROR: Essential columns missing in {os.path.basename(file_path)}:")
-        for col in missing_cols:
-            print(f"  - '{col}'")
-        print("Stopping processing for this file due to missing essential columns.")
-        return False # Indicate failure, do not move the file
-    print("All essential columns found.")
-    # --- <<< END: ESSENTIAL COLUMN CHECK >>> ---
-
-
-    # 1. Clean Data Types
-    print("Cleaning data types...")
-    # Convert date columns (object -> datetime)
-    # Using errors='coerce' handles bad date formats gracefully -> becomes NaT
-    if 'event_date_start' in df_error.columns:
-        df_error['event_date_start'] = pd.to_datetime(df_error['event_date_start'], errors='coerce')
-    if 'event_date_end' in df_error.columns:
-        df_error['event_date_end'] = pd.to_datetime(df_error['event_date_end'], errors='coerce')
-    print("Converted date columns.")
-
-    # Convert numeric columns, coercing errors to NaN, then filling NaN with 0
-    numeric_cols = [
-        'area_partially_damaged_ha', 'area_totally_damaged_ha', 'area_total_affected_ha',
-        'farmers_affected', 'losses_php_production_cost', 'losses_php_farm_gate',
-        'losses_php_grand_total'
-    ]
-    for col in numeric_cols:
-        if col in df_error.columns:
-            df_error[col] = pd.to_numeric(df_error[col], errors='coerce').fillna(0)
-    print("Converted numeric columns.")
-
-    # Ensure essential string columns are strings and handle potential NaNs
-    string_cols = ['province', 'municipality', 'commodity', 'disaster_category',
-                   'disaster_name', 'error_reason', 'disaster_type_raw', 'sanitation_remarks']
-    for col in string_cols:
-         if col in df_error.columns:
-            df_error[col] = df_error[col].astype(str).fillna('Unknown')
-    print("Ensured string columns are strings.")
-
-    # Ensure year and source_row_number are integer types (handle potential NaNs from coercion)
-    if 'year' in df_error.columns:
-         df_error['year'] = pd.to_numeric(df_error['year'], errors='coerce').astype('Int64') # Nullable Integer
-    if 'source_row_number' in df_error.columns:
-         df_error['source_row_number'] = pd.to_numeric(df_error['source_row_number'], errors='coerce').astype('Int64') # Nullable Integer
-    print("Converted integer columns.")
-
-    # 2. Select and Order Final Columns
-    # Ensure only columns defined in FINAL_DELTA_COLUMNS that actually exist are kept
-    final_columns_present = [col for col in FINAL_DELTA_COLUMNS if col in df_error.columns]
-    df_final = df_error[final_columns_present].copy()
-    print(f"Selected final columns for Delta table: {df_final.columns.tolist()}")
-
-
-    # 3. Write to Quarantine Delta Table (Overwrite each time for simplicity)
-    print(f"Writing final cleaned data to quarantine Delta table: {QUARANTINE_LAKEHOUSE_PATH}...")
-    # Overwrite mode for quarantine table - processing one error file at a time effectively replaces content
-    write_deltalake(
-        QUARANTINE_LAKEHOUSE_PATH,
-        df_final,
-        mode='overwrite', # Overwrite the quarantine table each run
-        schema_mode='overwrite' # Ensure schema matches the final DataFrame
-    )
-    print("Successfully wrote to quarantine Delta table.")
-
-    # 4. Optional: Analyze errors
-    if 'error_reason' in df_final.columns:
-        print("\n--- Error Summary ---")
-        print(df_final['error_reason'].value_counts())
-
-    return True # Indicate success
+        try:
+            error_rel = con.read_csv(file_path)
+            current_columns = error_rel.columns
+        except duckdb.IOException as e:
+            print(f"ERROR: File not found: {file_path} ({e})")
+            return False
+        except Exception as e:
+            print(f"ERROR reading file {os.path.basename(file_path)}: {e}")
+            return False
+
+        # --- <<< START: ESSENTIAL COLUMN CHECK >>> ---
+        print("Checking for essential columns...")
+        missing_cols = [col for col in ESSENTIAL_INPUT_COLUMNS if col not in current_columns]
+        if missing_cols:
+            print(f"ERROR: Essential columns missing in {os.path.basename(file_path)}:")
+            for col in missing_cols:
+                print(f"  - '{col}'")
+            print("Stopping processing for this file due to missing essential columns.")
+            return False # Indicate failure, do not move the file
+        print("All essential columns found.")
+        # --- <<< END: ESSENTIAL COLUMN CHECK >>> ---
+
+
+        # 1. Clean Data Types (one vectorized projection; TRY_CAST turns bad values into NULL)
+        print("Cleaning data types...")
+        numeric_cols = [
+            'area_partially_damaged_ha', 'area_totally_damaged_ha', 'area_total_affected_ha',
+            'farmers_affected', 'losses_php_production_cost', 'losses_php_farm_gate',
+            'losses_php_grand_total'
+        ]
+        string_cols = ['province', 'municipality', 'commodity', 'disaster_category',
+                       'disaster_name', 'error_reason', 'disaster_type_raw', 'sanitation_remarks']
+
+        # 2. Select and Order Final Columns
+        # Ensure only columns defined in FINAL_DELTA_COLUMNS that actually exist are kept
+        final_columns_present = [col for col in FINAL_DELTA_COLUMNS if col in current_columns]
+        select_exprs = []
+        for col in final_columns_present:
+            if col in ('event_date_start', 'event_date_end'):
+                # Bad date formats become NULL timestamps
+                select_exprs.append(f'TRY_CAST("{col}" AS TIMESTAMP) AS "{col}"')
+            elif col in numeric_cols:
+                # Non-numeric values become 0
+                select_exprs.append(f'COALESCE(TRY_CAST("{col}" AS DOUBLE), 0) AS "{col}"')
+            elif col in string_cols:
+                select_exprs.append(f'COALESCE(CAST("{col}" AS VARCHAR), \'Unknown\') AS "{col}"')
+            elif col in ('year', 'source_row_number'):
+                # Nullable 64-bit integers
+                select_exprs.append(f'TRY_CAST("{col}" AS BIGINT) AS "{col}"')
+            else:
+                select_exprs.append(f'"{col}"')
+        final_table = error_rel.project(", ".join(select_exprs)).to_arrow_table()
+        print("Converted date, numeric, string and integer columns.")
+        print(f"Selected final columns for Delta table: {final_columns_present}")
+
+        if final_table.num_rows == 0:
+            print("Skipping empty file.")
+            return True # Treat as success for moving file
+
+
+        # 3. Write to Quarantine Delta Table (Overwrite each time for simplicity)
+        print(f"Writing final cleaned data to quarantine Delta table: {QUARANTINE_LAKEHOUSE_PATH}...")
+        # Overwrite mode for quarantine table - processing one error file at a time effectively replaces content
+        write_deltalake(
+            QUARANTINE_LAKEHOUSE_PATH,
+            final_table,
+            mode='overwrite', # Overwrite the quarantine table each run
+            schema_mode='overwrite' # Ensure schema matches the final table
+        )
+        print("Successfully wrote to quarantine Delta table.")
+
+        # 4. Optional: Analyze errors
+        if 'error_reason' in final_columns_present:
+            print("\n--- Error Summary ---")
+            con.from_arrow(final_table).aggregate("error_reason, COUNT(*) AS count", "error_reason").order("count DESC").show()
+
+        return True # Indicate success
+    finally:
+        con.close()
 
 # --- Main Execution ---
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+"""
+Checks the column-wise date parser (parse_date_column) against the per-row reference parser
+(parse_date_range_smart) on edge cases, and the error_reason texts sanitize_data writes.
+"""
+import importlib.util
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+SANITIZER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'drrm_datasets', 'sanitizer_test.py')
+_spec = importlib.util.spec_from_file_location('sanitizer', SANITIZER_PATH)
+sanitizer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sanitizer)
+
+
+def expected_result(date_value, year_value):
+    """ parse_date_range_smart's result as parse_date_column stores it (datetime64, out-of-range rule). """
+    start, end, remark = sanitizer.parse_date_range_smart(date_value, year_value)
+    start_ts = pd.to_datetime(start, errors='coerce') if start is not None else pd.NaT
+    end_ts = pd.to_datetime(end, errors='coerce') if end is not None else pd.NaT
+    if (start is not None and pd.isna(start_ts)) or (end is not None and pd.isna(end_ts)):
+        return pd.NaT, pd.NaT, sanitizer.OUT_OF_RANGE_REMARK
+    return start_ts, end_ts, remark
+
+
+def assert_matches_row_parser(dates, years):
+    index = pd.RangeIndex(5, 5 + 2 * len(dates), 2) # Not a default index, to catch positional mix-ups
+    starts, ends, remarks = sanitizer.parse_date_column(pd.Series(dates, index=index, dtype=object),
+                                                         pd.Series(years, index=index, dtype=float))
+    assert len(starts) == len(ends) == len(remarks) == len(dates)
+    for i, (date_value, year_value) in enumerate(zip(dates, years)):
+        exp_start, exp_end, exp_remark = expected_result(date_value, year_value)
+        got = (pd.Timestamp(starts[i]), pd.Timestamp(ends[i]), remarks[i])
+        assert (got[0] is pd.NaT and exp_start is pd.NaT) or got[0] == exp_start, (date_value, year_value, got)
+        assert (got[1] is pd.NaT and exp_end is pd.NaT) or got[1] == exp_end, (date_value, year_value, got)
+        assert got[2] == exp_remark, (date_value, year_value, got)
+
+
+EDGE_CASES = [
+    # "Month Day[-Day], Year"
+    ('November 4, 2010', 2010), ('november 4 - 7,2010', 2010), ('February 29, 2024', 2024),
+    ('February 29, 2023', 2023), ('April 31, 2013', 2013), ('April 0, 2013', 2013), ('Sept 4, 2013', 2013),
+    # "Month-Month Year" and "Month Year"
+    ('July-August 2021', 2021), ('December-January 2013', 2013), ('Foo-August 2021', 2021),
+    ('November 2012', 2012), (' February 2024 ', 2024), ('Jan 2013', 2013),
+    # Free-form ranges handled by the per-row parser
+    ('March 5 - February 2, 2013', 2013), ('October 9 to 12, 2013', 2013), ('December 2013 to January 2014', 2013),
+    ('November 30 - December 2, 2013', 2013), ('March 5 to Present', 2013), ('garbage', 2013),
+    # Year drift (more than one year from the Year column) and a non-integral Year
+    ('March 5, 2015', 2013), ('July-August 2016', 2013), ('May 2010', 2013), ('May 2014', 2013.7),
+    # Blank Year column
+    ('March 5, 2013', np.nan), ('October 9 to 12', np.nan), ('garbage', np.nan),
+    # ISO timestamps
+    ('2017-10-12', 2017), ('2017-10-12 00:00:00', 2017), ('2017-02-30', 2017), ('2019-10-12', 2017),
+    # Native Excel dates, numbers and missing cells
+    (datetime(2013, 3, 4, 13, 0), 2013), (datetime(2016, 3, 4), 2013), (2013, 2013), (2013.0, 2013), (np.nan, 2013),
+    # pandas Timestamp bounds (1677-09-21 .. 2262-04-11)
+    ('April 5, 2262', 2262), ('April 5-30, 2262', 2262), ('April 2262', 2262), ('March 2262', 2262),
+    ('March-April 2262', 2262), ('April 12, 2262', 2262), ('September 1677', 1677), ('September 22, 1677', 1677),
+    ('September 20, 1677', 1677), ('0999-01-01', 999),
+]
+
+
+@pytest.mark.parametrize('date_value, year_value', EDGE_CASES)
+def test_parse_date_column_matches_row_parser(date_value, year_value):
+    assert_matches_row_parser([date_value], [year_value])
+
+
+def test_parse_date_column_batch_with_duplicates():
+    # All cases together, repeated in a different order, so the dedup/broadcast step is exercised
+    dates, years = zip(*(EDGE_CASES + EDGE_CASES[::-1]))
+    assert_matches_row_parser(list(dates), list(years))
+
+
+def test_parse_date_column_empty():
+    starts, ends, remarks = sanitizer.parse_date_column(pd.Series([], dtype=object), pd.Series([], dtype=float))
+    assert len(starts) == len(ends) == len(remarks) == 0
+
+
+def test_sanitize_data_error_reasons(tmp_path):
+    base = {
+        'YEAR (DATE OF OCCURENCE)': 2013, 'ACTUAL DATE OF OCCURENCE': 'March 5, 2013',
+        'PROVINCE AFFECTED': 'Iloilo', 'MUNICIPALITY AFFECTED': 'Dueñas', 'COMMODITY': '01 - Rice',
+        'DISASTER TYPE': 'Flood', 'HYDROMETEOROLOGICAL EVENTS / GENERAL DISASTER EVENTS': 'Typhoon',
+        'NAME OF DISASTER': 'Yolanda',
+        'Totally Damaged (AREA AFFECTED (HA.) / MORTALITY HEADS / NO. OF UNITS AFFECTED)': 1,
+        'Partially Damaged (AREA AFFECTED (HA.) / MORTALITY HEADS / NO. OF UNITS AFFECTED)': 2,
+        'TOTAL (AREA AFFECTED (HA.) / MORTALITY HEADS / NO. OF UNITS AFFECTED)': 3,
+        'NUMBER OF FARMERS AFFECTED': 4, 'GRAND TOTAL': '1,000',
+        'Total Value (Based on Cost of Production / Inputs)': 500,
+        'Total Value - Based on Farm Gate Price': 500, 'Volume (MT) - Based on Farm Gate Price ': 0.5,
+    }
+    perturbations = [
+        {}, # Clean
+        {'PROVINCE AFFECTED': None},
+        {'YEAR (DATE OF OCCURENCE)': 'abc', 'ACTUAL DATE OF OCCURENCE': 'garbage'},
+        {'GRAND TOTAL': '-'},
+        {'MUNICIPALITY AFFECTED': 'Atlantis'},
+        {'ACTUAL DATE OF OCCURENCE': 'March 5 - February 2, 2013'},
+        {'Partially Damaged (AREA AFFECTED (HA.) / MORTALITY HEADS / NO. OF UNITS AFFECTED)': 2.5,
+         'TOTAL (AREA AFFECTED (HA.) / MORTALITY HEADS / NO. OF UNITS AFFECTED)': 10},
+        {'ACTUAL DATE OF OCCURENCE': 'March 5, 2015'},
+        {'ACTUAL DATE OF OCCURENCE': 'April 2262', 'YEAR (DATE OF OCCURENCE)': 2262},
+    ]
+    sheet = pd.DataFrame([{**base, **change} for change in perturbations])
+    input_path = tmp_path / 'source.xlsx'
+    with pd.ExcelWriter(input_path, engine='openpyxl') as writer:
+        sheet.to_excel(writer, sheet_name='Data', index=False, startrow=1) # Header on row 2, as in the source
+    lookup_path = tmp_path / 'psgc.csv'
+    pd.DataFrame({'province_name': ['Iloilo'], 'municipality_name': ['Dueñas'], 'psgc_code': [603010000]}).to_csv(lookup_path, index=False)
+
+    sanitizer.sanitize_data(str(input_path), 'Data', str(tmp_path / 'out'), 'clean.csv', 'errors.csv', str(lookup_path))
+
+    clean = pd.read_csv(tmp_path / 'out' / 'clean.csv', encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    errors = pd.read_csv(tmp_path / 'out' / 'errors.csv', encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    assert clean[['year', 'event_date_start', 'municipality', 'psgc_code', 'commodity', 'losses_php_grand_total']].values.tolist() == [
+        ['2013', '2013-03-05', 'DUEÑAS', '603010000', 'RICE', '1000']]
+    assert dict(zip(errors['source_row_number'], errors['error_reason'])) == {
+        '4': "Missing essential field (province).",
+        '5': "Original Year column is not a valid number: 'abc'; Unparseable date: 'garbage'",
+        '6': "Missing or zero Grand Total for PHP loss.",
+        '7': "PSGC code not found for province/municipality: 'ILOILO' / 'ATLANTIS'.",
+        '8': "Date range invalid: Start date (2013-03-05) is after end date (2013-02-02).",
+        '9': "Area inconsistency: Partial(2.5) + Totally(1) != Total(10).",
+        '10': "Unparseable date: 'March 5, 2015' (Year in date string (2015) differs significantly from Year column (2013).)",
+        '11': f"Unparseable date: 'April 2262' ({sanitizer.OUT_OF_RANGE_REMARK})",
+    }